@@ -5,7 +5,8 @@ from typing import Any, List, Optional
 from dotenv import load_dotenv
 from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from openai import OpenAI
+import httpx
+from openai import AsyncOpenAI, OpenAI
 
 # Load environment variables from .env file in the backend directory
 import pathlib
@@ -56,6 +57,8 @@ class Settings(BaseSettings):
     OPENAI_API_KEY: str = Field(default="", description="OpenAI API key")
     OPENAI_ORGANIZATION: str = Field(default="", description="OpenAI organization ID")
     OPENAI_MODEL: str = Field(default="gpt-3.5-turbo", description="OpenAI model name")
+    OPENAI_CLASSIFIER_MODEL: str = Field(default="gpt-4o-mini", description="Cheap OpenAI model for yes/no classification prompts")
+    OPENAI_EMBEDDING_MODEL: str = Field(default="text-embedding-3-small", description="OpenAI embedding model used by the semantic response cache")
     OPENAI_ENABLED: bool = Field(default=True, description="Whether OpenAI is enabled")
 
     # Tavily settings
@@ -68,6 +71,10 @@ class Settings(BaseSettings):
     SUPABASE_ANON_KEY: str = Field(default="", description="Supabase anon key")
     SUPABASE_JWT_SECRET: str = Field(default="", description="Supabase JWT secret")
     SUPABASE_ENABLED: bool = Field(default=True, description="Whether Supabase is enabled")
+    SUPABASE_SERVICE_TOKENS_ENABLED: bool = Field(
+        default=False,
+        description="Authorize tokens with app_metadata.role == 'service' as admin without a user lookup"
+    )
 
     # Stripe settings
     STRIPE_SECRET_KEY: str = Field(default="", description="Stripe secret key")
@@ -81,6 +88,13 @@ class Settings(BaseSettings):
     # Logging settings
     LOG_LEVEL: str = Field(default="INFO", description="Logging level")
 
+    # Rate limiting settings
+    RATE_LIMIT_STORAGE_URI: str = Field(
+        default="memory://",
+        description="Rate limit counter storage; use redis://host:6379/0 so all workers share one limit"
+    )
+    RATE_LIMIT_STRATEGY: str = Field(default="moving-window", description="Rate limiting strategy")
+
     class Config:
         env_file = ".env"
         case_sensitive = True
@@ -92,6 +106,8 @@ class Settings(BaseSettings):
         # Load OpenAI API key from environment
         self.OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
         self.OPENAI_MODEL = os.environ.get("OPENAI_MODEL", self.OPENAI_MODEL)
+        self.OPENAI_CLASSIFIER_MODEL = os.environ.get("OPENAI_CLASSIFIER_MODEL", self.OPENAI_CLASSIFIER_MODEL)
+        self.OPENAI_EMBEDDING_MODEL = os.environ.get("OPENAI_EMBEDDING_MODEL", self.OPENAI_EMBEDDING_MODEL)
         if not self.OPENAI_API_KEY:
             logger.warning("OPENAI_API_KEY environment variable not set. OpenAI-related features will be disabled.")
             self.OPENAI_ENABLED = False
@@ -157,5 +173,21 @@ class Settings(BaseSettings):
             logger.error(f"Failed to initialize OpenAI client: {e}")
             return None
 
+    def get_async_openai_client(self):
+        if not self.OPENAI_ENABLED:
+            return None
+        try:
+            # One pooled client is shared process-wide, so size the pool for
+            # every concurrent request rather than httpx's default of 100
+            return AsyncOpenAI(
+                api_key=self.OPENAI_API_KEY,
+                http_client=httpx.AsyncClient(
+                    limits=httpx.Limits(max_connections=1000, max_keepalive_connections=1000)
+                )
+            )
+        except Exception as e:
+            logger.error(f"Failed to initialize async OpenAI client: {e}")
+            return None
+
 # Create and export the settings instance
 settings = Settings()
\ No newline at end of file
@@ -2,6 +2,7 @@ from sqlalchemy import Boolean, Column, String, DateTime, JSON, Integer
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from datetime import datetime, timezone
+import time
 import uuid
 from ..db.database import Base
 
@@ -55,10 +56,14 @@ class User(Base):
         if not self.subscription_status or self.subscription_status != "active":
             return False
         
-        if not self.subscription_expires_at:
+        expires_at = self.subscription_expires_at
+        if not expires_at:
             return False
+        # Stored in UTC; some backends (SQLite) hand it back without tzinfo
+        if expires_at.tzinfo is None:
+            expires_at = expires_at.replace(tzinfo=timezone.utc)
             
-        return self.subscription_expires_at > datetime.now(timezone.utc)
+        return expires_at.timestamp() > time.time()
     
     def can_make_request(self) -> bool:
         """Check if user can make API requests based on their subscription and usage"""
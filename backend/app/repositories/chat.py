@@ -2,7 +2,7 @@ from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
 from ..models.chat import Chat, ChatMessage, ChatFileData
 from ..models.user import User
-from typing import List, Optional, Dict, Any, Union
+from typing import List, Optional, Dict, Any, Tuple, Union
 import logging
 from datetime import datetime
 from uuid import UUID
@@ -166,6 +166,20 @@ class ChatRepository:
             logger.error(f"Error adding message to chat {chat_id}: {e}")
             return None
 
+    def add_messages(self, chat_id: Union[str, UUID], messages: List[Tuple[str, str]]) -> Optional[List[ChatMessage]]:
+        """Add several (role, content) messages to a chat session in one commit"""
+        try:
+            chat_id_str = self._ensure_string_id(chat_id)
+            chat_messages = [ChatMessage(chat_id=chat_id_str, role=role, content=content) for role, content in messages]
+            self.db.add_all(chat_messages)
+            self.db.commit()
+            logger.info(f"Added {len(chat_messages)} messages to chat {chat_id_str}")
+            return chat_messages
+        except SQLAlchemyError as e:
+            self.db.rollback()
+            logger.error(f"Error adding messages to chat {chat_id}: {e}")
+            return None
+
     def add_file_data(self, chat_id: Union[str, UUID], filename: str, file_type: str, content: Dict[str, Any], summary: str = None) -> Optional[ChatFileData]:
         """Add file data to a chat session"""
         try:
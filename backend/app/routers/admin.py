@@ -4,11 +4,12 @@ from ..models.support import SupportMessage
 from fastapi import APIRouter, HTTPException, Depends, Request, Response
 from sqlalchemy.orm import Session
 from sqlalchemy import desc
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 from pydantic import BaseModel
 
 from ..db.database import get_db
 from ..services.auth import get_current_user
+from ..utils.security import get_admin_token_payload
 
 router = APIRouter()
 
@@ -55,10 +56,13 @@ def require_admin(current_user: User = Depends(get_current_user)):
         )
     return current_user
 
+# Read-only endpoints gate on the token's role claim, without loading the
+# admin's User row; endpoints that record the acting admin use require_admin
+
 # Get admin dashboard data
 @router.get("/dashboard", response_model=AdminDashboardResponse)
 async def get_admin_dashboard(
-    admin_user: User = Depends(require_admin),
+    admin_claims: Dict[str, Any] = Depends(get_admin_token_payload),
     db: Session = Depends(get_db)
 ):
     try:
@@ -133,7 +137,7 @@ async def get_admin_dashboard(
 async def get_all_users(
     page: int = 1,
     limit: int = 50,
-    admin_user: User = Depends(require_admin),
+    admin_claims: Dict[str, Any] = Depends(get_admin_token_payload),
     db: Session = Depends(get_db)
 ):
     try:
@@ -172,7 +176,7 @@ async def get_support_messages(
     page: int = 1,
     limit: int = 20,
     status: Optional[str] = None,
-    admin_user: User = Depends(require_admin),
+    admin_claims: Dict[str, Any] = Depends(get_admin_token_payload),
     db: Session = Depends(get_db)
 ):
     try:
@@ -12,9 +12,8 @@ from io import StringIO
 import pandas as pd
 from uuid import UUID
 import re
-from slowapi import Limiter
-from slowapi.util import get_remote_address
 from ..utils.security import get_current_user_from_token
+from ..utils.rate_limit import limiter
 from ..models.user import User
 
 from ..db.database import get_db
@@ -25,9 +24,6 @@ from ..services.tavily_agent_service import TavilyAgentService
 from ..services.cache_service import query_cache
 import hashlib
 
-# Initialize rate limiter
-limiter = Limiter(key_func=get_remote_address)
-
 # Initialize Tavily agent service
 tavily_agent = TavilyAgentService()
 
@@ -312,7 +308,7 @@ async def send_message(
             openai_service = OpenAIService()
             if len(file_content_str) > max_context_chars:
                 logging.info(f"[API] File content exceeds {max_context_chars} chars, summarizing with LLM.")
-                summary = openai_service.summarize_text(file_content_str[:8000], max_tokens=400)  # Limit input to 8k chars for summarization
+                summary = await openai_service.asummarize_text(file_content_str[:8000], max_tokens=400)  # Limit input to 8k chars for summarization
                 if summary and not summary.startswith('[SUMMARY ERROR'):
                     file_content_str = summary
                     summarized = True
@@ -352,7 +348,7 @@ async def send_message(
             # Check if Tavily agent is available
             if hasattr(tavily_agent, 'is_available') and tavily_agent.is_available:
                 try:
-                    response_message = tavily_agent.answer(
+                    response_message = await tavily_agent.aanswer(
                         user_message=chat_input.message,
                         profile=chat_input.profile,
                         file_context=context_data_str
@@ -363,7 +359,7 @@ async def send_message(
                     response_message = "I was unable to search the web for additional information. Please try rephrasing your question or ask about a different topic."
             else:
                 logging.warning("[API] Tavily agent not available, falling back to OpenAI")
-                response_message = openai_service.chat_with_context(
+                response_message = await openai_service.achat_with_context(
                     user_question=chat_input.message,
                     messages=messages,
                     profile=chat_input.profile or "general",
@@ -371,7 +367,7 @@ async def send_message(
                 )
         else:
             # Use OpenAI first, then fallback to Tavily if needed
-            response_message = openai_service.chat_with_context(
+            response_message = await openai_service.achat_with_context(
                 user_question=chat_input.message,
                 messages=messages,
                 profile=chat_input.profile or "general",
@@ -379,13 +375,13 @@ async def send_message(
             )
 
             # Use LLM to check if the response is a 'no information' answer
-            if openai_service.is_no_info_response_llm(response_message):
+            if await openai_service.ais_no_info_response_llm(response_message):
                 logging.info("[API] LLM indicated no information available (LLM intent), triggering Tavily agentic fallback.")
                 
                 # Check if Tavily agent is available
                 if hasattr(tavily_agent, 'is_available') and tavily_agent.is_available:
                     try:
-                        response_message = tavily_agent.answer(
+                        response_message = await tavily_agent.aanswer(
                             user_message=chat_input.message,
                             profile=chat_input.profile,
                             file_context=context_data_str
@@ -1,4 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import StreamingResponse, FileResponse
 from pydantic import BaseModel
 from typing import List, Dict, Any, Optional
@@ -8,6 +9,7 @@ import logging
 from datetime import datetime
 import os
 import shutil
+import tempfile
 from pathlib import Path
 import pandas as pd
 import numpy as np
@@ -24,14 +26,14 @@ from ..utils.security import get_current_user_from_token
 # Initialize logger
 logger = logging.getLogger(__name__)
 from ..services.file_processor import FileProcessor
-from ..services.cache_service import query_cache, partial_result_cache
+from ..services.cache_service import query_cache
 
 router = APIRouter(
     tags=["files"]
 )
 
 # Supported file types for upload
-SUPPORTED_FILE_TYPES = [
+SUPPORTED_FILE_TYPES = frozenset({
     # Data files
     'csv', 'json', 'xlsx', 'xls',
     # Document files
@@ -40,7 +42,15 @@ SUPPORTED_FILE_TYPES = [
     'jpg', 'jpeg', 'png', 'gif', 'bmp', 'tiff', 'webp',
     # Other common formats
     'html', 'xml', 'yaml', 'yml'
-]
+})
+
+# Types that get a direct analysis instead of enhanced extraction
+ANALYSIS_FILE_TYPES = frozenset({'csv', 'json', 'xlsx', 'xls'})
+
+# Uploads are spooled in memory up to this size, then rolled over to disk
+UPLOAD_SPOOL_MAX_SIZE = 4 * 1024 * 1024
+UPLOAD_COPY_CHUNK_SIZE = 64 * 1024
+MAX_UPLOAD_SIZE = 50 * 1024 * 1024
 
 def convert_numpy(obj):
     if isinstance(obj, dict):
@@ -56,6 +66,23 @@ def convert_numpy(obj):
     else:
         return obj
 
+def _spool_upload(src, dst) -> int:
+    """
+    Copy an upload into dst in fixed-size chunks, stopping as soon as it
+    exceeds MAX_UPLOAD_SIZE so an oversized body is never copied whole.
+
+    Returns:
+        Number of bytes copied
+    """
+    copied = 0
+    while copied <= MAX_UPLOAD_SIZE:
+        chunk = src.read(UPLOAD_COPY_CHUNK_SIZE)
+        if not chunk:
+            break
+        dst.write(chunk)
+        copied += len(chunk)
+    return copied
+
 @router.post("/upload")
 async def upload_file(
     file: UploadFile,
@@ -71,24 +98,28 @@ async def upload_file(
     with a new or existing chat session.
     Accepts optional OCR options: force_ocr (bool), ocr_language (comma-separated string)
     """
+    temp_file = None
     try:
-        # Read file into memory once
-        file_bytes = await file.read()
-        file_size = len(file_bytes)
-        max_size = 50 * 1024 * 1024
-        if file_size > max_size:
-            raise HTTPException(status_code=413, detail=f"File size exceeds 50MB")
+        too_large = HTTPException(
+            status_code=413,
+            detail=f"File size exceeds maximum allowed size of {MAX_UPLOAD_SIZE // (1024 * 1024)}MB"
+        )
+        if file.size is not None and file.size > MAX_UPLOAD_SIZE:
+            raise too_large
+        # Copy the upload into a spool in fixed-size chunks, off the event
+        # loop, instead of reading it into memory whole; anything past
+        # UPLOAD_SPOOL_MAX_SIZE rolls over to disk
+        temp_file = tempfile.SpooledTemporaryFile(max_size=UPLOAD_SPOOL_MAX_SIZE)
+        file_size = await run_in_threadpool(_spool_upload, file.file, temp_file)
+        temp_file.seek(0)
+        if file_size > MAX_UPLOAD_SIZE:
+            raise too_large
         file_ext = file.filename.split('.')[-1].lower()
         if file_ext not in SUPPORTED_FILE_TYPES:
             raise HTTPException(status_code=415, detail=f"Unsupported file type: .{file_ext}")
-        # Create a new UploadFile-like object from bytes for processing
+        # Hand the spool to the processor as a fresh UploadFile
         from fastapi import UploadFile
-        from io import BytesIO
-        import tempfile
-        temp_file = tempfile.SpooledTemporaryFile(max_size=max_size)
-        temp_file.write(file_bytes)
-        temp_file.seek(0)
-        upload_file_for_processing = UploadFile(filename=file.filename, file=temp_file)
+        upload_file_for_processing = UploadFile(filename=file.filename, file=temp_file, size=file_size)
         logger.info(f"[API] Created new UploadFile for processing: {upload_file_for_processing.filename}, size: {file_size}")
         chat_repo = ChatRepository(db)
 
@@ -131,7 +162,7 @@ async def upload_file(
         else:
             ocr_language_list = ['eng']
         logger.info(f"[API] Using OCR language(s): {ocr_language_list}")
-        if analysis_type and file_ext in ['csv', 'json', 'xlsx', 'xls']:
+        if analysis_type and file_ext in ANALYSIS_FILE_TYPES:
             logger.info(f"Performing '{analysis_type}' analysis on {file.filename}")
             # Basic analysis for now - can be enhanced later
             analysis_results = {"type": analysis_type, "status": "basic_analysis"}
@@ -174,11 +205,8 @@ async def upload_file(
                 if f"faq:{target_chat_id}:" in key:
                     query_cache.cache.invalidate(key)
                     logger.info(f"[CACHE] Invalidated FAQ/query cache: {key}")
-            # Invalidate all partial result cache for this file (brute-force: all keys with file.filename)
-            for key in list(partial_result_cache.cache.keys()):
-                if f"partial:{file.filename}:" in key:
-                    partial_result_cache.cache.invalidate(key)
-                    logger.info(f"[CACHE] Invalidated partial result cache: {key}")
+            # Partial results are keyed by content hash, so a changed file never
+            # hits a stale entry and no per-file invalidation is needed
             # --- End cache invalidation ---
         final_response = {
             "success": True,
@@ -202,4 +230,6 @@ async def upload_file(
         logger.error(f"[API] Unexpected error: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"An unexpected error occurred: {str(e)}")
     finally:
+        if temp_file is not None:
+            temp_file.close()
         await file.close()
\ No newline at end of file
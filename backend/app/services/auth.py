@@ -8,7 +8,7 @@ import logging
 
 from ..db.database import get_db
 from ..repositories.user import UserRepository
-from ..utils.security import verify_token, security, get_current_user_from_token
+from ..utils.security import verify_token, get_current_user_from_token
 from ..models.user import User
 
 logger = logging.getLogger(__name__)
@@ -1,16 +1,25 @@
 import time
 import threading
-from typing import Any, Dict, Optional, Tuple
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
 
 class InMemoryCache:
-    def __init__(self):
-        self._cache: Dict[str, Tuple[Any, float, Optional[float]]] = {}
+    def __init__(self, max_entries: int = 10_000):
+        # Kept in least- to most-recently-used order. Expired entries are never
+        # read again, so they drift to the front and are evicted first.
+        self._cache: "OrderedDict[str, Tuple[Any, float, Optional[float]]]" = OrderedDict()
+        self.max_entries = max_entries
         self._lock = threading.Lock()
 
     def set(self, key: str, value: Any, ttl: Optional[float] = None):
         expire_at = time.time() + ttl if ttl else None
         with self._lock:
             self._cache[key] = (value, time.time(), expire_at)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
 
     def get(self, key: str) -> Optional[Any]:
         with self._lock:
@@ -21,6 +30,7 @@ class InMemoryCache:
             if expire_at and time.time() > expire_at:
                 del self._cache[key]
                 return None
+            self._cache.move_to_end(key)
             return value
 
     def invalidate(self, key: str):
@@ -73,6 +83,101 @@ class PartialResultCache:
     def invalidate(self, file_id: str, result_type: str):
         self.cache.invalidate(self.make_key(file_id, result_type))
 
+# Response cache interface for external APIs, keyed by a hash of the request
+class ResponseCache:
+    def __init__(self, cache: InMemoryCache, prefix: str = "llm"):
+        self.cache = cache
+        self.prefix = prefix
+        self.hits = 0
+        self.misses = 0
+
+    def make_key(self, request_hash: str) -> str:
+        return f"{self.prefix}:{request_hash}"
+
+    def get(self, request_hash: str) -> Optional[Any]:
+        value = self.cache.get(self.make_key(request_hash))
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, request_hash: str, value: Any, ttl: Optional[float] = None):
+        self.cache.set(self.make_key(request_hash), value, ttl)
+
+    def invalidate(self, request_hash: str):
+        self.cache.invalidate(self.make_key(request_hash))
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
+
+# Semantic cache: nearest-neighbour lookup over L2-normalised embeddings, so
+# paraphrased questions asked against the same context reuse one completion
+class SemanticCache:
+    def __init__(self, threshold: float = 0.92, ttl: float = 3600, max_entries: int = 4096):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        # Ring buffer: the matrix is allocated once on the first set and rows
+        # are overwritten oldest-first, so inserts never copy it
+        self._vectors: Optional[np.ndarray] = None
+        self._hashes = np.empty(max_entries, dtype=object)
+        self._expires = np.zeros(max_entries)
+        self._values: List[Any] = [None] * max_entries
+        self._next = 0
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _normalize(vector: Sequence[float]) -> np.ndarray:
+        arr = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(arr)
+        return arr / norm if norm else arr
+
+    def get(self, vector: Sequence[float], context_hash: str) -> Optional[Any]:
+        query = self._normalize(vector)
+        with self._lock:
+            if self._vectors is None or self._vectors.shape[1] != query.shape[0]:
+                self.misses += 1
+                return None
+            size = self._size
+            scores = self._vectors[:size] @ query
+            # Expired entries and other contexts can never match
+            scores[(self._expires[:size] < time.time()) | (self._hashes[:size] != context_hash)] = -np.inf
+            index = int(np.argmax(scores))
+            if scores[index] >= self.threshold:
+                self.hits += 1
+                return self._values[index]
+            self.misses += 1
+            return None
+
+    def set(self, vector: Sequence[float], context_hash: str, value: Any):
+        row = self._normalize(vector)
+        with self._lock:
+            if self._vectors is None or self._vectors.shape[1] != row.shape[0]:
+                self._vectors = np.empty((self.max_entries, row.shape[0]), dtype=np.float32)
+                self._next = self._size = 0
+            slot = self._next
+            self._vectors[slot] = row
+            self._hashes[slot] = context_hash
+            self._expires[slot] = time.time() + self.ttl
+            self._values[slot] = value
+            self._next = (slot + 1) % self.max_entries
+            self._size = min(self._size + 1, self.max_entries)
+
+    def clear(self):
+        with self._lock:
+            self._vectors = None
+            self._values = [None] * self.max_entries
+            self._next = self._size = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            entries = int((self._expires[:self._size] >= time.time()).sum())
+        return {"hits": self.hits, "misses": self.misses, "entries": entries}
+
 # Adaptive TTL logic (stub)
 def get_adaptive_ttl(document_volatility: float, access_frequency: float) -> float:
     # Example: shorter TTL for volatile docs, longer for hot queries
@@ -85,4 +190,7 @@ def get_adaptive_ttl(document_volatility: float, access_frequency: float) -> flo
 
 # Export cache interfaces
 query_cache = QueryCache(cache)
-partial_result_cache = PartialResultCache(cache)
\ No newline at end of file
+partial_result_cache = PartialResultCache(cache)
+response_cache = ResponseCache(cache)
+search_cache = ResponseCache(cache, prefix="tavily")
+semantic_cache = SemanticCache()
\ No newline at end of file
@@ -22,8 +22,12 @@ class ExportService:
                 df.to_csv(output, index=False)
                 return output.getvalue().encode('utf-8')
 
-            # Convert any problematic data types
-            df_clean = self._clean_dataframe_for_export(df)
+            # Convert any problematic data types; all-float frames are already
+            # CSV-safe, so skip the cleaner's full copy for them
+            if self._needs_cleaning(df):
+                df_clean = self._clean_dataframe_for_export(df)
+            else:
+                df_clean = df
 
             output = io.StringIO()
             df_clean.to_csv(output, index=False)
@@ -36,6 +40,12 @@ class ExportService:
             logger.error(f"Error exporting to CSV: {str(e)}")
             raise
 
+    def _needs_cleaning(self, df: pd.DataFrame) -> bool:
+        """Check whether any column has a dtype that _clean_dataframe_for_export rewrites"""
+        # Only float columns pass through the cleaner unchanged (NaN is written
+        # as an empty field by to_csv either way)
+        return any(dtype.kind != 'f' for dtype in df.dtypes)
+
     def _clean_dataframe_for_export(self, df: pd.DataFrame) -> pd.DataFrame:
         """Clean DataFrame to ensure it can be exported properly"""
         try:
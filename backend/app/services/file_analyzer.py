@@ -1,4 +1,5 @@
 # app/services/file_analyzer.py
+import io
 import pandas as pd
 import json
 import logging
@@ -57,7 +58,7 @@ class FileAnalyzer:
         """Load file content into a pandas DataFrame."""
         file_extension = file_name.split('.')[-1].lower()
         if file_extension == 'csv':
-            return pd.read_csv(pd.io.common.BytesIO(file_content))
+            return pd.read_csv(io.BytesIO(file_content), engine='c', low_memory=False)
         elif file_extension == 'json':
             data = json.loads(file_content.decode('utf-8'))
             if isinstance(data, list):
@@ -66,7 +67,7 @@ class FileAnalyzer:
                 # Attempt to normalize a single JSON object
                 return pd.json_normalize(data)
         elif file_extension in ['xlsx', 'xls']:
-             return pd.read_excel(pd.io.common.BytesIO(file_content))
+             return pd.read_excel(io.BytesIO(file_content))
         else:
             raise ValueError(f"Unsupported file type for DataFrame conversion: {file_extension}")
 
@@ -118,7 +119,7 @@ class FileAnalyzer:
         """Analyze CSV file content"""
         try:
             # Parse CSV content
-            df = pd.read_csv(pd.io.common.BytesIO(content))
+            df = pd.read_csv(io.BytesIO(content), engine='c', low_memory=False)
 
             # Get basic statistics
             stats = self._generate_statistics(df)
@@ -217,14 +218,16 @@ class FileAnalyzer:
                 column_info.append(f"{col} ({col_type}): {col_summary}")
 
             df_summary = "\n".join(column_info)
-            df_head = df.head(5).to_string()
+            # CSV is cheaper to build than the aligned to_string() layout and
+            # tokenizes shorter; cap the column count for very wide frames
+            df_head = df.iloc[:5, :100].to_csv(index=False)
 
             # Use OpenAI to generate insights
             prompt = f"""
             I have a dataset with {len(df)} rows and {len(df.columns)} columns:
             {df_summary}
 
-            Here's a preview of the first 5 rows:
+            Here's a preview of the first 5 rows (CSV):
             {df_head}
 
             {context}
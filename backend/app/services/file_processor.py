@@ -3,7 +3,7 @@ import os
 import json
 import logging
 import pandas as pd
-from typing import Dict, Any, List, Optional, Union
+from typing import Dict, Any, List, Optional, Tuple, Union
 from datetime import datetime
 import hashlib
 import mimetypes
@@ -18,9 +18,14 @@ from ..services.cache_service import partial_result_cache
 import logging
 import sys
 import traceback
-import base64
 import re
+import functools
 import gc
+import math
+import operator
+import threading
+import multiprocessing as mp
+from concurrent.futures import ThreadPoolExecutor
 import psutil
 from dataclasses import dataclass
 from fastapi import UploadFile
@@ -29,6 +34,27 @@ from docling.datamodel.document import DoclingDocument
 from docling.datamodel.base_models import InputFormat
 import tempfile
 
+# SIMD base64 for the image/document fallback payloads; the stdlib encoder is
+# a drop-in replacement when pybase64 is not installed
+try:
+    import pybase64 as base64
+except ImportError:
+    import base64
+
+# Faster JSON decoding for uploads; orjson.JSONDecodeError subclasses
+# json.JSONDecodeError, so error handling is the same with either parser
+try:
+    from orjson import loads as _json_loads
+except ImportError:
+    from json import loads as _json_loads
+
+# Rust-backed Excel reader; pandas picks it up as engine='calamine'
+try:
+    import python_calamine  # noqa: F401
+    CALAMINE_AVAILABLE = True
+except ImportError:
+    CALAMINE_AVAILABLE = False
+
 
 DOCLING_AVAILABLE = False
 DoclingDocument = DoclingDocument  # Make it available for type hints
@@ -74,6 +100,471 @@ class TimeoutError(Exception):
     pass
 
 
+# Page-parallel Docling conversion: PDFs with more pages than this are split
+# into chunks and converted across worker processes. Below it, process
+# startup and model loading outweigh the gain. The worker cap is shared out
+# between the WEB_CONCURRENCY uvicorn workers, each of which owns its pools.
+PARALLEL_PDF_MIN_PAGES = 3
+PARALLEL_PDF_MAX_WORKERS = max(1, min((os.cpu_count() or 1) // max(1, int(os.environ.get("WEB_CONCURRENCY", 1))), 8))
+
+# Born-digital PDF probe: PDFs whose first pages average more extractable
+# characters than this already carry a text layer and skip OCR entirely
+BORN_DIGITAL_PROBE_PAGES = 3
+BORN_DIGITAL_MIN_CHARS_PER_PAGE = 200
+
+# Formats that benefit from Docling processing
+ENHANCED_FORMATS = frozenset({
+    'pdf', 'docx', 'pptx', 'xlsx',
+    'png', 'jpg', 'jpeg', 'tiff', 'tif', 'bmp', 'webp',
+    'html', 'htm'
+})
+
+# Extension groups for the basic (non-Docling) handlers
+IMAGE_FORMATS = frozenset({'jpg', 'jpeg', 'png', 'gif', 'bmp', 'tiff', 'webp'})
+EXCEL_FORMATS = frozenset({'xlsx', 'xls'})
+TEXT_FORMATS = frozenset({'txt', 'md', 'rtf', 'html', 'xml', 'yaml', 'yml'})
+DOCUMENT_FORMATS = frozenset({'pdf', 'docx', 'doc', 'odt'})
+
+# Content analysis patterns for _structure_docling_content
+CHART_KEYWORDS = ('chart', 'graph', 'figure', 'rating', 'satisfaction', 'bar chart', 'pie chart',
+                  'line graph', 'diagram', 'plot', '2002', '2003', '2004')
+# Zero-width lookahead so overlapping keywords ('bar chart' and 'chart') are
+# all found in a single pass over the document
+_CHART_KEYWORD_RE = re.compile(
+    r'(?=(' + '|'.join(map(re.escape, CHART_KEYWORDS)) + r'))', re.IGNORECASE
+)
+_NUMBER_RE = re.compile(r'\b\d+\.?\d*\b')
+_YEAR_RE = re.compile(r'\b(?:19|20)\d{2}\b')
+
+# Docling item fields read by _structure_docling_content, as (name, default).
+# attrgetter fetches all of them in one C-level call; items missing any field
+# fall back to per-attribute getattr with these defaults.
+_ITEM_STR = object()  # default placeholder meaning "str() of the item itself"
+_PICTURE_FIELDS = (('text', ''), ('caption', ''), ('bbox', None), ('page_no', None),
+                   ('image_class', 'unknown'), ('annotations', {}), ('prov', None))
+_TABLE_FIELDS = (('text', ''), ('caption', ''), ('bbox', None), ('page_no', None),
+                 ('otsl_seq', ''), ('prov', None))
+_TEXT_FIELDS = (('text', _ITEM_STR), ('label', 'text'), ('bbox', None), ('page_no', None),
+                ('level', 0), ('prov', None))
+_GET_PICTURE_FIELDS = operator.attrgetter(*(name for name, _ in _PICTURE_FIELDS))
+_GET_TABLE_FIELDS = operator.attrgetter(*(name for name, _ in _TABLE_FIELDS))
+_GET_TEXT_FIELDS = operator.attrgetter(*(name for name, _ in _TEXT_FIELDS))
+
+# How long a system resource reading is reused before sampling again
+RESOURCE_SAMPLE_TTL = 5.0  # seconds
+
+# Chunk size used when streaming uploads to disk
+UPLOAD_COPY_CHUNK_SIZE = 1 << 20  # 1 MiB
+
+# Images below this pixel count, or whose grayscale thumbnail varies less than
+# this, are treated as having no text (icons, logos, blank scans) and skip OCR
+OCR_MIN_IMAGE_PIXELS = 64 * 64
+OCR_MIN_IMAGE_STDDEV = 2.0
+OCR_PROBE_THUMBNAIL_SIZE = (64, 64)
+
+# Longest data preview embedded in the chat message for a file upload
+UPLOAD_PREVIEW_MAX_CHARS = 2048
+
+# Labels exported from Docling documents to markdown
+MARKDOWN_EXPORT_LABELS = {
+    "title", "paragraph", "caption", "table", "text", "section_header", "footnote", "page_footer", "page_header", "document_index", "reference"
+}
+
+
+def _file_extension(filename: Optional[str]) -> str:
+    """Lowercased extension of an uploaded file's name, without the dot."""
+    return Path(filename).suffix.lstrip('.').lower() if filename else ''
+
+
+@functools.lru_cache(maxsize=256)
+def _should_enhance(filename: Optional[str], force_ocr: bool, enhanced_enabled: bool) -> bool:
+    """Pure routing decision behind FileProcessor._should_use_enhanced_processing."""
+    if not enhanced_enabled:
+        return False
+    if force_ocr:
+        return True
+    return _file_extension(filename) in ENHANCED_FORMATS
+
+
+def _get_item_fields(item: Any, getter: operator.attrgetter, fields: tuple) -> tuple:
+    """Fetch a Docling item's fields, falling back to defaults for missing ones."""
+    try:
+        return getter(item)
+    except AttributeError:
+        values = []
+        for name, default in fields:
+            value = getattr(item, name, default)
+            values.append(str(item) if value is _ITEM_STR else value)
+        return tuple(values)
+
+
+def _extract_pdf_text(content: bytes) -> Tuple[str, int]:
+    """
+    Extract the text layer of a PDF with PyPDF2.
+
+    Args:
+        content: Raw PDF bytes
+
+    Returns:
+        Tuple of (extracted text, page count)
+    """
+    import PyPDF2
+    import io
+
+    # Create PDF reader from bytes
+    pdf_reader = PyPDF2.PdfReader(io.BytesIO(content))
+
+    # Extract text from all pages; join once instead of growing a string per page
+    page_texts = []
+    for page in pdf_reader.pages:
+        page_texts.append(page.extract_text())
+    return "\n".join(page_texts) + "\n", len(pdf_reader.pages)
+
+
+# Threads for PyPDF2 text extraction so it runs off the event loop. Each PDF is
+# extracted by a single thread: pages of one PdfReader share its underlying
+# stream, so extracting them concurrently is not safe.
+_pdf_thread_pool = ThreadPoolExecutor(max_workers=PARALLEL_PDF_MAX_WORKERS, thread_name_prefix="pypdf2")
+
+
+# Private directory for upload temp files, created on first use and shared by
+# every FileProcessor (one is built per upload) rather than one per instance.
+_upload_temp_dir: Optional[str] = None
+_upload_temp_dir_lock = threading.Lock()
+
+
+def _get_upload_temp_dir() -> str:
+    """Return the shared upload temp directory, creating it on first use."""
+    global _upload_temp_dir
+    with _upload_temp_dir_lock:
+        if _upload_temp_dir is None or not os.path.isdir(_upload_temp_dir):
+            _upload_temp_dir = tempfile.mkdtemp(prefix="fileproc_")
+        return _upload_temp_dir
+
+
+def _read_csv_records(handle: Any) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """
+    Parse a CSV upload into row records.
+
+    Args:
+        handle: Binary file object positioned at the start of the CSV
+
+    Returns:
+        Tuple of (records, column names)
+    """
+    # The C parser with low_memory off infers each column's dtype in one
+    # pass instead of chunk by chunk
+    df = pd.read_csv(handle, engine='c', low_memory=False)
+    return df.to_dict(orient='records'), list(df.columns)
+
+
+def _read_excel(handle: Any) -> pd.DataFrame:
+    """Parse an Excel upload, preferring the calamine engine over openpyxl."""
+    if CALAMINE_AVAILABLE:
+        try:
+            return pd.read_excel(handle, engine='calamine')
+        except Exception as e:
+            logger.warning(f"Calamine failed to parse Excel file, falling back to default engine: {e}")
+            handle.seek(0)
+    return pd.read_excel(handle)
+
+
+def _parse_tabular_file(handle: Any, file_ext: str) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """
+    Parse a CSV or Excel upload into row records.
+
+    Args:
+        handle: Binary file object of the spooled upload
+        file_ext: 'csv', 'xlsx' or 'xls'
+
+    Returns:
+        Tuple of (records, column names)
+    """
+    handle.seek(0)
+    if file_ext == 'csv':
+        return _read_csv_records(handle)
+    df = _read_excel(handle)
+    return df.to_dict(orient='records'), list(df.columns)
+
+
+def _base_metadata(file_name: Optional[str], file_size: int, fmt: str, **extra: Any) -> Dict[str, Any]:
+    """Metadata shared by every basic (non-Docling) processing result."""
+    return {
+        'file_name': file_name,
+        'file_size': file_size,
+        'format': fmt,
+        'processing_method': 'basic',
+        **extra
+    }
+
+
+def _basic_result(content: Any, metadata: Dict[str, Any], start_time: float) -> Dict[str, Any]:
+    """Wrap basic processing output in process_file's result shape."""
+    return {
+        'success': True,
+        'content': content,
+        'metadata': metadata,
+        'processing_time': time.time() - start_time,
+        'enhanced_processing': False
+    }
+
+
+def _json_preview(data: Any, max_chars: int = UPLOAD_PREVIEW_MAX_CHARS) -> str:
+    """
+    JSON-encode data for a message preview, stopping after max_chars.
+
+    Encoding is incremental, so a huge payload is only serialised as far as
+    the preview needs rather than in full.
+    """
+    parts = []
+    length = 0
+    for part in json.JSONEncoder(default=str).iterencode(data):
+        parts.append(part)
+        length += len(part)
+        if length >= max_chars:
+            return ''.join(parts)[:max_chars] + '...'
+    return ''.join(parts)
+
+
+def _copy_upload(src: Any, fd: int, hasher: Optional[Any] = None) -> int:
+    """
+    Copy an upload's file object into an open descriptor, closing it.
+
+    Args:
+        src: Binary file object to copy from its current position
+        fd: Descriptor from tempfile.mkstemp, closed on return
+        hasher: Optional hashlib object updated with every chunk
+
+    Returns:
+        Number of bytes written
+    """
+    with os.fdopen(fd, 'wb') as dst:
+        while True:
+            chunk = src.read(UPLOAD_COPY_CHUNK_SIZE)
+            if not chunk:
+                break
+            if hasher is not None:
+                hasher.update(chunk)
+            dst.write(chunk)
+        return dst.tell()
+
+
+def _image_worth_ocr(content: bytes) -> bool:
+    """
+    Cheap check for whether an image could contain text worth OCR-ing.
+
+    Only the header is parsed for the size check; the uniformity check
+    works on a small grayscale thumbnail. Anything that cannot be checked
+    is assumed to be worth OCR-ing.
+    """
+    try:
+        from PIL import Image, ImageStat
+        import io
+
+        with Image.open(io.BytesIO(content)) as img:
+            width, height = img.size
+            if width * height < OCR_MIN_IMAGE_PIXELS:
+                return False
+            # JPEG decoders can downscale while decoding
+            img.draft('L', OCR_PROBE_THUMBNAIL_SIZE)
+            thumbnail = img.convert('L')
+            thumbnail.thumbnail(OCR_PROBE_THUMBNAIL_SIZE)
+            return ImageStat.Stat(thumbnail).stddev[0] >= OCR_MIN_IMAGE_STDDEV
+    except Exception as e:
+        logger.debug(f"Image OCR probe failed, attempting OCR anyway: {e}")
+        return True
+
+
+def _content_hash(content: bytes) -> str:
+    """Content-addressed cache key for uploaded file bytes."""
+    return hashlib.blake2b(content, digest_size=16).hexdigest()
+
+
+@functools.lru_cache(maxsize=4)
+def _build_converter(force_ocr: bool, ocr_language: Optional[tuple]) -> "DocumentConverter":
+    """
+    Build a Docling converter using the full-page OCR PDF pipeline.
+
+    Converters load their layout, table and OCR models on first use, so one
+    is cached per option set and reused for the lifetime of the process.
+    """
+    from docling.datamodel.pipeline_options import (
+        PdfPipelineOptions,
+        TesseractCliOcrOptions,
+    )
+    from docling.document_converter import DocumentConverter, PdfFormatOption
+
+    pipeline_options = PdfPipelineOptions()
+    # OCR stays enabled, but unless forced Docling only OCRs the bitmap regions
+    # of a page (bitmap_area_threshold) instead of every full page
+    pipeline_options.do_ocr = True
+    pipeline_options.do_table_structure = True
+    pipeline_options.table_structure_options.do_cell_matching = True
+    ocr_options = TesseractCliOcrOptions(force_full_page_ocr=force_ocr)
+    if ocr_language:
+        ocr_options.lang = list(ocr_language)
+    pipeline_options.ocr_options = ocr_options
+
+    return DocumentConverter(
+        format_options={
+            InputFormat.PDF: PdfFormatOption(
+                pipeline_options=pipeline_options,
+            )
+        }
+    )
+
+
+def _export_markdown(document: "DoclingDocument") -> str:
+    """Export a converted Docling document to markdown."""
+    # Use the correct argument for export_to_markdown: 'labels' instead of 'main_text_labels'
+    return document.export_to_markdown(
+        delim="\n\n",
+        labels=MARKDOWN_EXPORT_LABELS,
+        strict_text=False,
+        image_placeholder="<!-- image -->"
+    )
+
+
+def _docling_convert_chunk(path: str, force_ocr: bool, ocr_language: Optional[list]) -> str:
+    """
+    Convert a single PDF chunk to markdown.
+
+    Runs inside a worker process, so it must stay a top-level function to be
+    picklable and builds its own converter (Docling models can't cross
+    process boundaries).
+    """
+    # Record which worker runs this conversion so a timeout can kill just
+    # this process. If the caller already gave up and removed the input,
+    # this fails immediately instead of converting for nobody.
+    pid_path = _pid_path(path)
+    with open(pid_path, 'w') as pid_file:
+        pid_file.write(str(os.getpid()))
+    try:
+        # Each worker process keeps its own converter cache, so models load
+        # once per worker rather than once per chunk
+        converter = _build_converter(force_ocr, tuple(ocr_language) if ocr_language else None)
+        return _export_markdown(converter.convert(path).document)
+    finally:
+        try:
+            os.unlink(pid_path)
+        except OSError:
+            pass
+
+
+def _pid_path(path: str) -> str:
+    """File next to a conversion input holding the PID of the worker converting it."""
+    return f"{path}.pid"
+
+
+def _split_pdf_pages(temp_path: str, workers: int = PARALLEL_PDF_MAX_WORKERS) -> Optional[List[str]]:
+    """
+    Split a PDF into page chunks for parallel Docling conversion.
+
+    Args:
+        temp_path: Path to the PDF on disk
+        workers: Number of chunks to aim for
+
+    Returns:
+        Paths of the chunk PDFs in page order (all inside one temporary
+        directory owned by the caller), or None if the PDF is too small to
+        benefit from parallel conversion
+    """
+    import pypdfium2 as pdfium
+
+    pdf = pdfium.PdfDocument(temp_path)
+    try:
+        num_pages = len(pdf)
+        if num_pages <= PARALLEL_PDF_MIN_PAGES or workers < 2:
+            return None
+
+        pages_per_chunk = math.ceil(num_pages / workers)
+        chunk_dir = tempfile.mkdtemp(prefix="docling_chunks_")
+        chunk_paths = []
+        for chunk_idx, first_page in enumerate(range(0, num_pages, pages_per_chunk)):
+            chunk = pdfium.PdfDocument.new()
+            try:
+                chunk.import_pages(pdf, list(range(first_page, min(first_page + pages_per_chunk, num_pages))))
+                chunk_path = os.path.join(chunk_dir, f"chunk_{chunk_idx}.pdf")
+                chunk.save(chunk_path)
+            finally:
+                chunk.close()
+            chunk_paths.append(chunk_path)
+    finally:
+        pdf.close()
+
+    logger.info(f"[DOCLING] Split {num_pages} pages into {len(chunk_paths)} parallel chunks")
+    return chunk_paths
+
+
+# Shared Docling worker pool. Conversion runs in separate processes so a
+# runaway conversion can actually be killed on timeout; the pool is shared
+# across FileProcessor instances (one is created per upload). A
+# multiprocessing Pool replaces a killed worker and keeps serving other
+# tasks, where a ProcessPoolExecutor would mark itself broken and fail every
+# conversion in flight.
+_docling_pool: Optional["mp.pool.Pool"] = None
+_docling_pool_lock = threading.Lock()
+
+
+def _get_docling_pool() -> "mp.pool.Pool":
+    """Return the shared Docling process pool, creating it on first use."""
+    global _docling_pool
+    with _docling_pool_lock:
+        if _docling_pool is None:
+            _docling_pool = mp.get_context("spawn").Pool(processes=PARALLEL_PDF_MAX_WORKERS)
+        return _docling_pool
+
+
+def _submit_docling_task(pool: "mp.pool.Pool", *args: Any) -> "asyncio.Future":
+    """Run _docling_convert_chunk in the pool, resolving an asyncio future with its result."""
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+
+    def _resolve(setter: Any, value: Any) -> None:
+        # The future is cancelled when the caller times out
+        if not future.done():
+            setter(value)
+
+    def _notify(setter: Any, value: Any) -> None:
+        # Called from the pool's result thread
+        try:
+            loop.call_soon_threadsafe(_resolve, setter, value)
+        except RuntimeError:
+            pass  # loop already closed
+
+    pool.apply_async(
+        _docling_convert_chunk, args,
+        callback=lambda result: _notify(future.set_result, result),
+        error_callback=lambda error: _notify(future.set_exception, error),
+    )
+    return future
+
+
+def _kill_docling_tasks(paths: List[str]) -> None:
+    """
+    Kill the workers still converting paths; the pool starts replacements.
+
+    Conversions that finished have removed their PID file, and ones that
+    have not started will fail on their removed input, so only the
+    processes working on this upload are touched.
+    """
+    for path in paths:
+        try:
+            with open(_pid_path(path)) as pid_file:
+                pid = int(pid_file.read())
+        except (OSError, ValueError):
+            continue
+        try:
+            psutil.Process(pid).kill()
+        except psutil.Error as e:
+            logger.warning("Failed to kill Docling worker %s: %s", pid, e)
+        # A killed worker never reaches its own cleanup
+        try:
+            os.unlink(_pid_path(path))
+        except OSError:
+            pass
+
+
 class FileProcessor:
     """
     Enhanced file processor with Docling capabilities for intelligent document processing.
@@ -86,6 +577,10 @@ class FileProcessor:
     - Performance optimization
     """
 
+    # (timestamp, available_mb, cpu_percent), shared across instances since a
+    # FileProcessor is built per upload and concurrent uploads can share a reading
+    _resource_sample: Optional[Tuple[float, float, float]] = None
+
     def __init__(self, max_memory_mb: int = 2048, max_processing_time: int = 300):
         """
         Initialize the file processor.
@@ -98,11 +593,14 @@ class FileProcessor:
         self.max_processing_time = max_processing_time
         self.enhanced_processing_enabled = DOCLING_AVAILABLE
 
+        if FileProcessor._resource_sample is None:
+            # Prime psutil's CPU counters so the first non-blocking reading is meaningful
+            psutil.cpu_percent(interval=None)
+
         logger.info(f"FileProcessor initialization: DOCLING_AVAILABLE={DOCLING_AVAILABLE}")
 
         if self.enhanced_processing_enabled:
-            # Use default DocumentConverter for basic initialization
-            self.docling_converter = DocumentConverter()
+            # Converters are built lazily and cached per option set in the worker processes
             logger.info(f"Enhanced document processing enabled with OCR support (default settings)")
             logger.info(f"Max memory: {max_memory_mb}MB, Max processing time: {max_processing_time}s")
         else:
@@ -116,14 +614,12 @@ class FileProcessor:
             True if resources are sufficient, False otherwise
         """
         try:
-            memory = psutil.virtual_memory()
-            available_mb = memory.available / (1024 * 1024)
+            available_mb, cpu_percent = self._sample_system_resources()
 
             if available_mb < self.max_memory_mb:
                 logger.warning(f"Insufficient memory: {available_mb:.1f}MB available, {self.max_memory_mb}MB required")
                 return False
 
-            cpu_percent = psutil.cpu_percent(interval=1)
             if cpu_percent > 90:
                 logger.warning(f"High CPU usage: {cpu_percent}%")
                 return False
@@ -134,6 +630,22 @@ class FileProcessor:
             logger.error(f"Error checking system resources: {e}")
             return True  # Continue processing if we can't check resources
 
+    def _sample_system_resources(self) -> Tuple[float, float]:
+        """
+        Read available memory and CPU usage, reusing a recent reading.
+
+        Returns:
+            Tuple of (available memory in MB, CPU percent)
+        """
+        now = time.monotonic()
+        sample = FileProcessor._resource_sample
+        if sample is None or now - sample[0] > RESOURCE_SAMPLE_TTL:
+            memory = psutil.virtual_memory()
+            # interval=None measures since the previous call instead of sleeping
+            sample = (now, memory.available / (1024 * 1024), psutil.cpu_percent(interval=None))
+            FileProcessor._resource_sample = sample
+        return sample[1], sample[2]
+
     def _estimate_tokens(self, text: str) -> int:
         """
         Estimate token count for text content.
@@ -147,60 +659,54 @@ class FileProcessor:
         # Rough estimation: 1 token ≈ 4 characters for English text
         return len(text) // 4
 
-    def _process_with_timeout(self, func, *args, timeout_seconds: int = 60, **kwargs):
+    async def _convert_with_docling(self, temp_file_path: str, file_ext: str, force_ocr: bool,
+                                    ocr_language: Optional[list]) -> str:
         """
-        Process function with timeout mechanism.
+        Convert a document to markdown in the Docling worker pool.
+
+        Multi-page PDFs are split into page chunks converted in parallel.
 
         Args:
-            func: Function to execute
-            *args: Function arguments
-            timeout_seconds: Timeout in seconds
-            **kwargs: Function keyword arguments
+            temp_file_path: Path to the document on disk
+            file_ext: Lowercased file extension
+            force_ocr: Force full-page OCR
+            ocr_language: List of language codes for OCR
 
         Returns:
-            Function result or raises TimeoutError
+            Extracted markdown content or raises TimeoutError
         """
-        result = [None]
-        exception = [None]
+        pool = await asyncio.to_thread(_get_docling_pool)
 
-        def target():
+        # pypdfium2 parsing and writing the chunk files is blocking I/O
+        chunk_paths = await asyncio.to_thread(_split_pdf_pages, temp_file_path) if file_ext == 'pdf' else None
+        try:
+            paths = chunk_paths or [temp_file_path]
+            futures = [
+                _submit_docling_task(pool, path, force_ocr, ocr_language)
+                for path in paths
+            ]
             try:
-                result[0] = func(*args, **kwargs)
-            except Exception as e:
-                exception[0] = e
-
-        thread = threading.Thread(target=target)
-        thread.daemon = True
-        thread.start()
-        thread.join(timeout_seconds)
-
-        if thread.is_alive():
-            logger.warning(f"Processing timed out after {timeout_seconds} seconds")
-            raise TimeoutError(f"Processing timed out after {timeout_seconds} seconds")
-
-        if exception[0]:
-            raise exception[0]
-
-        return result[0]
+                # gather keeps submission order, so chunks merge in page order
+                markdown_chunks = await asyncio.wait_for(asyncio.gather(*futures), timeout=self.max_processing_time)
+            except asyncio.TimeoutError:
+                logger.warning(f"Processing timed out after {self.max_processing_time} seconds")
+                _kill_docling_tasks(paths)
+                raise TimeoutError(f"Processing timed out after {self.max_processing_time} seconds")
+        finally:
+            if chunk_paths:
+                shutil.rmtree(os.path.dirname(chunk_paths[0]), ignore_errors=True)
+
+        return "\n\n".join(markdown_chunks)
 
     async def _fallback_pdf_processing(self, file: UploadFile, content: bytes, start_time: float) -> Dict[str, Any]:
         """
         Fallback PDF processing using PyPDF2 when Docling fails.
         """
         try:
-            import PyPDF2
-            import io
-
             logger.info(f"Using PyPDF2 fallback for {file.filename}")
 
-            # Create PDF reader from bytes
-            pdf_reader = PyPDF2.PdfReader(io.BytesIO(content))
-
-            # Extract text from all pages
-            text_content = ""
-            for page_num in range(len(pdf_reader.pages)):
-                page = pdf_reader.pages[page_num]
-                text_content += page.extract_text() + "\n"
+            loop = asyncio.get_running_loop()
+            text_content, page_count = await loop.run_in_executor(_pdf_thread_pool, _extract_pdf_text, content)
 
             if not text_content.strip():
                 # If no text extracted, likely a scanned PDF
@@ -218,7 +724,7 @@ class FileProcessor:
                     'file_size': len(content),
                     'format': 'pdf',
                     'processing_method': 'pypdf2_fallback',
-                    'pages': len(pdf_reader.pages),
+                    'pages': page_count,
                     'extracted_chars': len(text_content)
                 },
                 'processing_time': time.time() - start_time,
@@ -229,6 +735,46 @@ class FileProcessor:
             logger.error(f"PyPDF2 fallback processing failed: {e}")
             raise
 
+    async def _parse_tabular(self, file: UploadFile, file_ext: str) -> Tuple[List[Dict[str, Any]], List[str]]:
+        """
+        Parse a CSV or Excel upload straight from its spool in a worker thread.
+
+        pandas' C parsers release the GIL for most of the work, so a thread
+        keeps the event loop free without copying the upload to disk or
+        pickling the rows back from another process.
+        """
+        return await asyncio.to_thread(_parse_tabular_file, file.file, file_ext)
+
+    def _is_born_digital(self, content: bytes) -> bool:
+        """
+        Probe whether a PDF has an embedded text layer.
+
+        Args:
+            content: Raw PDF bytes
+
+        Returns:
+            True if the first pages yield enough text to skip OCR, False for
+            scanned or unreadable PDFs
+        """
+        try:
+            import PyPDF2
+            import io
+
+            pdf_reader = PyPDF2.PdfReader(io.BytesIO(content))
+            probe_pages = min(BORN_DIGITAL_PROBE_PAGES, len(pdf_reader.pages))
+            if probe_pages == 0:
+                return False
+
+            total_chars = 0
+            for page_num in range(probe_pages):
+                total_chars += len((pdf_reader.pages[page_num].extract_text() or '').strip())
+
+            return total_chars / probe_pages > BORN_DIGITAL_MIN_CHARS_PER_PAGE
+
+        except Exception as e:
+            logger.warning(f"Born-digital probe failed, treating PDF as scanned: {e}")
+            return False
+
     def _should_use_enhanced_processing(self, file: UploadFile, force_ocr: bool = False) -> bool:
         """
         Determine if enhanced processing (Docling) should be used for the file.
@@ -239,20 +785,8 @@ class FileProcessor:
         - Documents that may contain tables or figures
         - If force_ocr is set, always use enhanced processing
         """
-        if not self.enhanced_processing_enabled:
-            logger.info(f"Enhanced processing disabled for {file.filename} - Docling not available")
-            return False
-        if force_ocr:
-            logger.info(f"Force OCR enabled for {file.filename}, using enhanced processing")
-            return True
-        file_ext = file.filename.split('.')[-1].lower() if file.filename else ''
-        enhanced_formats = {
-            'pdf', 'docx', 'pptx', 'xlsx',
-            'png', 'jpg', 'jpeg', 'tiff', 'tif', 'bmp', 'webp',
-            'html', 'htm'
-        }
-        should_use = file_ext in enhanced_formats
-        logger.info(f"Enhanced processing check for {file.filename} (ext: {file_ext}): {should_use}")
+        should_use = _should_enhance(file.filename, force_ocr, self.enhanced_processing_enabled)
+        logger.debug(f"Enhanced processing check for {file.filename} (force_ocr={force_ocr}): {should_use}")
         return should_use
 
     async def process_file_enhanced(self, file: UploadFile, force_ocr: bool = False, ocr_language: Optional[list] = None) -> ProcessingResult:
@@ -268,87 +802,68 @@ class FileProcessor:
             ProcessingResult with enhanced processing results
         """
         start_time = time.time()
-        file_id = file.filename  # TODO: Use content hash for uniqueness if needed
-        # --- Partial Result Cache Check (OCR) ---
-        cached_ocr = partial_result_cache.get(file_id, 'ocr')
-        if cached_ocr:
-            logger.info(f"[CACHE] Partial result cache HIT for file_id={file_id}, type=ocr")
-            return cached_ocr
-        logger.info(f"[CACHE] Partial result cache MISS for file_id={file_id}, type=ocr")
-        # --- End cache check ---
-        if not self.enhanced_processing_enabled:
-            logger.error(f"[DOCLING] Docling is not available for enhanced OCR on {file.filename}")
-            return ProcessingResult(
-                success=False,
-                error_message="Docling OCR is not available in this environment.",
-                processing_time=time.time() - start_time,
-                enhanced_processing=False
-            )
+        file_ext = _file_extension(file.filename)
+
+        # Stream the upload straight to a temp file for Docling, hashing chunks
+        # on the way, so the file is never held in memory as one bytes object.
+        # The hash keys the cache on content so same-named uploads never
+        # collide and re-uploads of an identical file hit regardless of name.
+        hasher = hashlib.blake2b(digest_size=16)
+        # The fd is closed before Docling opens the path, so the later unlink
+        # never races an open handle (a sharing violation on Windows).
+        fd, temp_file_path = tempfile.mkstemp(suffix=f".{file_ext}", dir=_get_upload_temp_dir())
+        # OCR options change the output, so they are part of the cache key
+        ocr_cache_type = f"ocr:{int(force_ocr)}:{','.join(ocr_language or ())}"
+
         try:
-            # Check system resources
-            if not self._check_system_resources():
+            copied = await asyncio.to_thread(_copy_upload, file.file, fd, hasher)
+            # Starlette reports the size from the multipart parser; fall back
+            # to the bytes we just streamed
+            file_size = getattr(file, 'size', None) or copied
+            file_id = hasher.hexdigest()
+
+            # --- Partial Result Cache Check (OCR) ---
+            cached_ocr = partial_result_cache.get(file_id, ocr_cache_type)
+            if cached_ocr:
+                logger.info(f"[CACHE] Partial result cache HIT for file_id={file_id}, type={ocr_cache_type}")
+                return cached_ocr
+            logger.info(f"[CACHE] Partial result cache MISS for file_id={file_id}, type={ocr_cache_type}")
+            # --- End cache check ---
+            if not self.enhanced_processing_enabled:
+                logger.error(f"[DOCLING] Docling is not available for enhanced OCR on {file.filename}")
                 return ProcessingResult(
                     success=False,
-                    error_message="Insufficient system resources for enhanced processing",
+                    error_message="Docling OCR is not available in this environment.",
                     processing_time=time.time() - start_time,
-                    enhanced_processing=True
+                    enhanced_processing=False
                 )
-
-            # Save file temporarily for Docling processing
-            import tempfile
-            import os
-
-            with tempfile.NamedTemporaryFile(delete=False, suffix=f".{file.filename.split('.')[-1]}") as temp_file:
-                content = await file.read()
-                logging.info(f"[ENHANCED] Before Docling: file={file.filename}, size={len(content)}, file pointer={getattr(file, 'tell', lambda: 'n/a')()}")
-                logging.info(f"[ENHANCED] Content preview: {content[:200] if content else 'EMPTY'}")
-                temp_file.write(content)
-                temp_file_path = temp_file.name
-
             try:
-                # Use official Docling full-page OCR pipeline
-                from docling.datamodel.base_models import InputFormat
-                from docling.datamodel.pipeline_options import (
-                    PdfPipelineOptions,
-                    TesseractCliOcrOptions,
-                )
-                from docling.document_converter import DocumentConverter, PdfFormatOption
-
-                pipeline_options = PdfPipelineOptions()
-                pipeline_options.do_ocr = True if force_ocr else True  # Always true for now, but can be toggled
-                pipeline_options.do_table_structure = True
-                pipeline_options.table_structure_options.do_cell_matching = True
-                ocr_options = TesseractCliOcrOptions(force_full_page_ocr=force_ocr)
-                if ocr_language:
-                    ocr_options.lang = ocr_language
-                pipeline_options.ocr_options = ocr_options
-
-                converter = DocumentConverter(
-                    format_options={
-                        InputFormat.PDF: PdfFormatOption(
-                            pipeline_options=pipeline_options,
-                        )
-                    }
-                )
+                # Check system resources
+                if not self._check_system_resources():
+                    return ProcessingResult(
+                        success=False,
+                        error_message="Insufficient system resources for enhanced processing",
+                        processing_time=time.time() - start_time,
+                        enhanced_processing=True
+                    )
+
+                logger.debug("[ENHANCED] Before Docling: file=%s, size=%s, file pointer=%s", file.filename, file_size, getattr(file, "tell", lambda: "n/a")())
+                if logger.isEnabledFor(logging.DEBUG):
+                    with open(temp_file_path, 'rb') as spooled:
+                        content_preview = spooled.read(200)
+                    logger.debug("[ENHANCED] Content preview: %s", content_preview if content_preview else 'EMPTY')
 
-                result = converter.convert(temp_file_path)
-                doc = result.document
-                # Use the correct argument for export_to_markdown: 'labels' instead of 'main_text_labels'
-                markdown_content = doc.export_to_markdown(
-                    delim="\n\n",
-                    labels={
-                        "title", "paragraph", "caption", "table", "text", "section_header", "footnote", "page_footer", "page_header", "document_index", "reference"
-                    },
-                    strict_text=False,
-                    image_placeholder="<!-- image -->"
-                )
-                logging.info(f"[DOCLING] Extracted markdown preview: {markdown_content[:1000]}")
+                # Use official Docling full-page OCR pipeline
+                markdown_content = await self._convert_with_docling(temp_file_path, file_ext, force_ocr, ocr_language)
+                # %.1000s truncates at format time, and only if the record is emitted
+                logger.info("[DOCLING] Extracted markdown preview: %.1000s", markdown_content)
                 token_estimate = self._estimate_tokens(markdown_content)
 
                 logger.info(f"[DOCLING] Extracted {len(markdown_content)} characters from {file.filename}")
                 if markdown_content:
-                    sample_content = markdown_content[:200].replace('\n', ' ')
-                    logger.info(f"[DOCLING] Sample content: {sample_content}...")
+                    if logger.isEnabledFor(logging.INFO):
+                        sample_content = markdown_content[:200].replace('\n', ' ')
+                        logger.info("[DOCLING] Sample content: %s...", sample_content)
                 else:
                     logger.warning(f"[DOCLING] No markdown content extracted from {file.filename}")
 
@@ -356,7 +871,7 @@ class FileProcessor:
                 content_data = {
                     'markdown_content': markdown_content,
                     'extraction_method': 'docling_ocr',
-                    'document_type': getattr(doc, 'type', 'pdf'),
+                    'document_type': file_ext or 'pdf',
                     'content_length': len(markdown_content)
                 }
                 result = ProcessingResult(
@@ -364,11 +879,11 @@ class FileProcessor:
                     content=content_data,
                     metadata={
                         'file_name': file.filename,
-                        'file_size': len(content),
+                        'file_size': file_size,
                         'format': 'enhanced_docling',
                         'token_estimate': token_estimate,
                         'processing_method': 'docling_ocr',
-                        'document_type': getattr(doc, 'type', 'pdf'),
+                        'document_type': file_ext or 'pdf',
                         'ocr_enabled': True,
                         'ocr_language': ocr_language or ['en'],
                         'force_ocr': force_ocr,
@@ -379,43 +894,43 @@ class FileProcessor:
                     enhanced_processing=True
                 )
                 # --- Store in Partial Result Cache (OCR) ---
-                partial_result_cache.set(file_id, 'ocr', result, ttl=3600)  # 1 hour TTL
+                partial_result_cache.set(file_id, ocr_cache_type, result, ttl=3600)  # 1 hour TTL
                 # --- End cache store ---
                 return result
 
-            finally:
-                # Clean up temporary file
-                try:
-                    os.unlink(temp_file_path)
-                except Exception as cleanup_error:
-                    logger.warning(f"Failed to clean up temp file {temp_file_path}: {cleanup_error}")
-
-        except TimeoutError as e:
-            logger.error(f"Timeout processing file with Docling: {file.filename} (type: {file.filename.split('.')[-1]})")
-            return ProcessingResult(
-                success=False,
-                error_message=f"Enhanced processing timed out: {str(e)}",
-                processing_time=time.time() - start_time,
-                enhanced_processing=True
-            )
-        except MemoryError:
-            logger.error(f"Memory error processing file with Docling: {file.filename} (type: {file.filename.split('.')[-1]})")
-            gc.collect()  # Force garbage collection
-            return ProcessingResult(
-                success=False,
-                error_message="Memory error during enhanced processing",
-                processing_time=time.time() - start_time,
-                enhanced_processing=True
-            )
-        except Exception as e:
-            logger.error(f"Error in enhanced file processing {file.filename} (type: {file.filename.split('.')[-1]}): {e}", exc_info=True)
-            logger.error(traceback.format_exc())
-            return ProcessingResult(
-                success=False,
-                error_message=f"Enhanced processing error: {str(e)}",
-                processing_time=time.time() - start_time,
-                enhanced_processing=True
-            )
+            except TimeoutError as e:
+                logger.error(f"Timeout processing file with Docling: {file.filename} (type: {file_ext})")
+                return ProcessingResult(
+                    success=False,
+                    error_message=f"Enhanced processing timed out: {str(e)}",
+                    processing_time=time.time() - start_time,
+                    enhanced_processing=True
+                )
+            except MemoryError:
+                logger.error(f"Memory error processing file with Docling: {file.filename} (type: {file_ext})")
+                gc.collect()  # Force garbage collection
+                return ProcessingResult(
+                    success=False,
+                    error_message="Memory error during enhanced processing",
+                    processing_time=time.time() - start_time,
+                    enhanced_processing=True
+                )
+            except Exception as e:
+                logger.error(f"Error in enhanced file processing {file.filename} (type: {file_ext}): {e}", exc_info=True)
+                logger.error(traceback.format_exc())
+                return ProcessingResult(
+                    success=False,
+                    error_message=f"Enhanced processing error: {str(e)}",
+                    processing_time=time.time() - start_time,
+                    enhanced_processing=True
+                )
+
+        finally:
+            # Clean up temporary file
+            try:
+                os.unlink(temp_file_path)
+            except Exception as cleanup_error:
+                logger.warning(f"Failed to clean up temp file {temp_file_path}: {cleanup_error}")
 
     def _structure_docling_content(self, document: DoclingDocument, markdown_content: str) -> Dict[str, Any]:
         """
@@ -437,15 +952,18 @@ class FileProcessor:
                 structured_data['pictures'] = []
                 for i, picture in enumerate(document.pictures):
                     try:
+                        text, caption, bbox, page_no, image_class, annotations, prov = _get_item_fields(
+                            picture, _GET_PICTURE_FIELDS, _PICTURE_FIELDS
+                        )
                         picture_data = {
                             'picture_id': i,
-                            'text': getattr(picture, 'text', ''),
-                            'caption': getattr(picture, 'caption', ''),
-                            'bbox': getattr(picture, 'bbox', None),
-                            'page_no': getattr(picture, 'page_no', None),
-                            'image_class': getattr(picture, 'image_class', 'unknown'),
-                            'annotations': getattr(picture, 'annotations', {}),
-                            'provenance': getattr(picture, 'prov', None)
+                            'text': text,
+                            'caption': caption,
+                            'bbox': bbox,
+                            'page_no': page_no,
+                            'image_class': image_class,
+                            'annotations': annotations,
+                            'provenance': prov
                         }
                         # Try to extract coordinates if available
                         if hasattr(picture, 'get_location'):
@@ -459,14 +977,17 @@ class FileProcessor:
                 structured_data['tables'] = []
                 for i, table in enumerate(document.tables):
                     try:
+                        text, caption, bbox, page_no, otsl_seq, prov = _get_item_fields(
+                            table, _GET_TABLE_FIELDS, _TABLE_FIELDS
+                        )
                         table_data = {
                             'table_id': i,
-                            'text': getattr(table, 'text', ''),
-                            'caption': getattr(table, 'caption', ''),
-                            'bbox': getattr(table, 'bbox', None),
-                            'page_no': getattr(table, 'page_no', None),
-                            'structure': getattr(table, 'otsl_seq', ''),
-                            'provenance': getattr(table, 'prov', None)
+                            'text': text,
+                            'caption': caption,
+                            'bbox': bbox,
+                            'page_no': page_no,
+                            'structure': otsl_seq,
+                            'provenance': prov
                         }
 
                         # Extract table data in multiple formats
@@ -486,16 +1007,19 @@ class FileProcessor:
             # Extract text items with rich metadata
             if hasattr(document, 'texts') and document.texts:
                 structured_data['texts'] = []
-                for i, text in enumerate(document.texts):
+                for i, text_item in enumerate(document.texts):
                     try:
+                        text, label, bbox, page_no, level, prov = _get_item_fields(
+                            text_item, _GET_TEXT_FIELDS, _TEXT_FIELDS
+                        )
                         text_data = {
                             'text_id': i,
-                            'text': getattr(text, 'text', str(text)),
-                            'label': getattr(text, 'label', 'text'),
-                            'bbox': getattr(text, 'bbox', None),
-                            'page_no': getattr(text, 'page_no', None),
-                            'level': getattr(text, 'level', 0),
-                            'provenance': getattr(text, 'prov', None)
+                            'text': text,
+                            'label': label,
+                            'bbox': bbox,
+                            'page_no': page_no,
+                            'level': level,
+                            'provenance': prov
                         }
                         structured_data['texts'].append(text_data)
                     except Exception as e:
@@ -529,20 +1053,16 @@ class FileProcessor:
                     pages_info.append(page_info)
 
             # Enhanced content analysis for charts/graphs
-            chart_keywords = ['chart', 'graph', 'figure', 'rating', 'satisfaction', 'bar chart', 'pie chart',
-                            'line graph', 'diagram', 'plot', '2002', '2003', '2004']
-            found_keywords = []
-            for keyword in chart_keywords:
-                if keyword.lower() in markdown_content.lower():
-                    found_keywords.append(keyword)
+            matched_keywords = {match.lower() for match in _CHART_KEYWORD_RE.findall(markdown_content)}
+            found_keywords = [keyword for keyword in CHART_KEYWORDS if keyword in matched_keywords]
 
             # Analyze extracted content for numerical data
             numerical_indicators = []
-            numbers = re.findall(r'\b\d+\.?\d*\b', markdown_content)
+            numbers = _NUMBER_RE.findall(markdown_content)
             if len(numbers) > 10:  # Likely contains numerical data
                 numerical_indicators.append('contains_numerical_data')
 
-            years = re.findall(r'\b(19|20)\d{2}\b', markdown_content)
+            years = _YEAR_RE.findall(markdown_content)
             if years:
                 numerical_indicators.append(f'contains_years: {list(set(years))}')
 
@@ -576,45 +1096,77 @@ class FileProcessor:
                 'error': str(e)
             }
 
-    async def process_file(self, file: UploadFile, force_ocr: bool = False, ocr_language: Optional[list] = None) -> Dict[str, Any]:
-        print('[TEST] Entered process_file')
-        logging.info('[TEST] Entered process_file')
+    async def process_file(self, file: UploadFile, force_ocr: bool = False, ocr_language: Optional[list] = None,
+                           include_raw_base64: bool = False) -> Dict[str, Any]:
         """
         Process uploaded file and return its content (backward compatibility method).
 
-        Optionally accepts OCR options.
+        Optionally accepts OCR options. The image and document fallbacks only
+        inline the file as base64 when include_raw_base64 is set; otherwise
+        the payload is None and only its byte size is reported.
         """
+        logger.debug("Entered process_file for %s", file.filename)
         start_time = time.time()
 
         try:
             # Log file pointer and size before reading
-            logging.info(f"[PROCESS_FILE] Before read: file={file.filename}, file pointer={getattr(file, 'tell', lambda: 'n/a')()}")
-            # Read file content first
-            content = await file.read()
-            file_ext = file.filename.split('.')[-1].lower() if file.filename else ''
-
-            # Force OCR for PDFs
+            logger.debug("[PROCESS_FILE] Before read: file=%s, file pointer=%s", file.filename, getattr(file, "tell", lambda: "n/a")())
+            # The upload stays in its spool; branches that need the raw bytes
+            # read them, the rest (JSON, CSV, Excel) parse the file handle
+            content = None
+            file_size = getattr(file, 'size', None)
+            if file_size is None:
+                file.file.seek(0, os.SEEK_END)
+                file_size = file.file.tell()
+            file.file.seek(0)
+            file_ext = _file_extension(file.filename)
+
+            # Born-digital PDFs already carry a text layer: extract it directly
+            # and leave the (much slower) Docling OCR pipeline for scans
             if file_ext == 'pdf':
+                content = await file.read()
+                file_hash = await asyncio.to_thread(_content_hash, content)
+                born_digital = partial_result_cache.get(file_hash, 'born_digital_probe')
+                if born_digital is None:
+                    loop = asyncio.get_running_loop()
+                    born_digital = await loop.run_in_executor(_pdf_thread_pool, self._is_born_digital, content)
+                    partial_result_cache.set(file_hash, 'born_digital_probe', born_digital, ttl=3600)
+                if born_digital:
+                    logger.debug("[PROCESS_FILE] Born-digital PDF detected, skipping OCR for %s", file.filename)
+                    return await self._fallback_pdf_processing(file, content, start_time)
+
+            # Only PDFs the probe found to be scans reach this point; force
+            # full-page OCR for those, everything else keeps the caller's choice
+            if file_ext == 'pdf' and not born_digital:
                 force_ocr = True
-                logging.info(f"[DEBUG] Forcing force_ocr=True for PDF: {file.filename}")
+                logger.debug("[DEBUG] Forcing force_ocr=True for scanned PDF: %s", file.filename)
 
             should_enhanced = self._should_use_enhanced_processing(file, force_ocr=force_ocr)
-            logging.info(f"[DEBUG] should_use_enhanced_processing={should_enhanced} for {file.filename}")
+            logger.debug("[DEBUG] should_use_enhanced_processing=%s for %s", should_enhanced, file.filename)
+            # Tiny or single-colour images cannot hold text worth a Docling run
+            ocr_skipped = False
+            if should_enhanced and file_ext in IMAGE_FORMATS:
+                content = await file.read()
+                await file.seek(0)
+                if not await asyncio.to_thread(_image_worth_ocr, content):
+                    logger.info("Skipping Docling OCR for tiny or uniform image: %s", file.filename)
+                    should_enhanced = False
+                    ocr_skipped = True
             docling_error = None
             if should_enhanced:
-                logging.info(f"Using enhanced processing for: {file.filename} (type: {file_ext})")
+                logger.info("Using enhanced processing for: %s (type: %s)", file.filename, file_ext)
                 await file.seek(0)
-                logging.info(f"[PROCESS_FILE] After seek(0): file pointer={getattr(file, 'tell', lambda: 'n/a')()}")
+                logger.debug("[PROCESS_FILE] After seek(0): file pointer=%s", getattr(file, "tell", lambda: "n/a")())
                 # --- Docling OCR fail-proof: try once, retry if fails ---
                 enhanced_result = await self.process_file_enhanced(file, force_ocr=force_ocr, ocr_language=ocr_language)
                 if not enhanced_result.success:
                     docling_error = enhanced_result.error_message
-                    logging.error(f"[DOCLING] Enhanced OCR failed for {file.filename}: {docling_error}")
-                    logging.warning(f"[DOCLING] First attempt failed for {file.filename}: {docling_error}. Retrying...")
+                    logger.error("[DOCLING] Enhanced OCR failed for %s: %s", file.filename, docling_error)
+                    logger.warning("[DOCLING] First attempt failed for %s: %s. Retrying...", file.filename, docling_error)
                     await file.seek(0)
                     enhanced_result = await self.process_file_enhanced(file, force_ocr=True, ocr_language=ocr_language or ['en'])
                 if enhanced_result.success:
-                    logging.info(f"Enhanced processing succeeded for {file.filename}")
+                    logger.info("Enhanced processing succeeded for %s", file.filename)
                     return {
                         'success': True,
                         'content': enhanced_result.content,
@@ -623,21 +1175,22 @@ class FileProcessor:
                         'enhanced_processing': True
                     }
                 else:
-                    logging.warning(f"Enhanced processing failed for {file.filename} after retry: {enhanced_result.error_message}")
+                    docling_error = enhanced_result.error_message
+                    logger.warning("Enhanced processing failed for %s after retry: %s", file.filename, docling_error)
                     # Fall back to basic processing for PDFs using PyPDF2
                     if file_ext == 'pdf':
                         try:
-                            logging.info(f"[DEBUG] Falling back to _fallback_pdf_processing for {file.filename}")
+                            logger.debug("[DEBUG] Falling back to _fallback_pdf_processing for %s", file.filename)
                             fallback_result = await self._fallback_pdf_processing(file, content, start_time)
                             # --- If fallback detects scanned PDF, re-attempt Docling OCR with alternate settings ---
                             fallback_text = fallback_result.get('content', {}).get('text_content', '')
                             if fallback_text.strip().startswith('This appears to be a scanned PDF') and self.enhanced_processing_enabled:
-                                logging.warning(f"[DOCLING] PyPDF2 fallback detected scanned PDF for {file.filename}. Re-attempting Docling OCR with alternate settings...")
+                                logger.warning("[DOCLING] PyPDF2 fallback detected scanned PDF for %s. Re-attempting Docling OCR with alternate settings...", file.filename)
                                 await file.seek(0)
                                 # Try Docling again with force_ocr and default to English
                                 enhanced_result2 = await self.process_file_enhanced(file, force_ocr=True, ocr_language=['eng'])
                                 if enhanced_result2.success:
-                                    logging.info(f"[DOCLING] Second-chance Docling OCR succeeded for {file.filename}")
+                                    logger.info("[DOCLING] Second-chance Docling OCR succeeded for %s", file.filename)
                                     return {
                                         'success': True,
                                         'content': enhanced_result2.content,
@@ -646,190 +1199,162 @@ class FileProcessor:
                                         'enhanced_processing': True
                                     }
                                 else:
-                                    logging.error(f"[DOCLING] Second-chance Docling OCR failed for {file.filename}: {enhanced_result2.error_message}")
+                                    logger.error("[DOCLING] Second-chance Docling OCR failed for %s: %s", file.filename, enhanced_result2.error_message)
                                     fallback_result['docling_error'] = enhanced_result2.error_message
                             return fallback_result
                         except Exception as fallback_error:
-                            logging.error(f"Fallback PDF processing also failed: {fallback_error}")
-                    logging.info(f"Falling back to basic processing for {file.filename}")
+                            logger.error("Fallback PDF processing also failed: %s", fallback_error)
+                    logger.info("Falling back to basic processing for %s", file.filename)
             else:
-                logging.info(f"[DEBUG] Not using enhanced processing for {file.filename}, using basic/fallback.")
+                logger.debug("[DEBUG] Not using enhanced processing for %s, using basic/fallback.", file.filename)
 
             # Basic processing (original logic)
             logger.info(f"Using basic processing for: {file.filename} (type: {file_ext})")
+            await file.seek(0)
 
-            if file_ext == 'json':
-                try:
-                    return {
-                        'success': True,
-                        'content': json.loads(content),
-                        'metadata': {
-                            'file_name': file.filename,
-                            'file_size': len(content),
-                            'format': 'json',
-                            'processing_method': 'basic'
-                        },
-                        'processing_time': time.time() - start_time,
-                        'enhanced_processing': False
-                    }
-                except json.JSONDecodeError as e:
-                    logger.error(f"Error decoding JSON: {str(e)}")
-                    raise ValueError("Invalid JSON file")
-
-            elif file_ext == 'csv':
-                try:
-                    # Read CSV content into pandas DataFrame
-                    df = pd.read_csv(pd.io.common.BytesIO(content))
-                    # Convert DataFrame to dict/list format
-                    return {
-                        'success': True,
-                        'content': df.to_dict(orient='records'),
-                        'metadata': {
-                            'file_name': file.filename,
-                            'file_size': len(content),
-                            'format': 'csv',
-                            'processing_method': 'basic',
-                            'rows': len(df),
-                            'columns': list(df.columns)
-                        },
-                        'processing_time': time.time() - start_time,
-                        'enhanced_processing': False
-                    }
-                except Exception as e:
-                    logger.error(f"Error processing CSV: {str(e)}")
-                    raise ValueError("Invalid CSV file")
-
-            elif file_ext in ['jpg', 'jpeg', 'png', 'gif', 'bmp', 'tiff', 'webp']:
-                try:
-                    # Enhanced processing for images: use Docling OCR if available
-                    if self.enhanced_processing_enabled:
-                        logger.info(f"Using Docling OCR for image: {file.filename}")
-                        await file.seek(0)
-                        enhanced_result = await self.process_file_enhanced(file, force_ocr=True)
-                        if enhanced_result.success:
-                            logger.info(f"Docling OCR succeeded for {file.filename}")
-                            return {
-                                'success': True,
-                                'content': enhanced_result.content,
-                                'metadata': enhanced_result.metadata,
-                                'processing_time': enhanced_result.processing_time,
-                                'enhanced_processing': True
-                            }
-                        else:
-                            logger.warning(f"Docling OCR failed for {file.filename}: {enhanced_result.error_message}")
-                            # Fallback to basic image processing
-                    # Fallback: store as base64 and note OCR is not available
-                    image_base64 = base64.b64encode(content).decode('utf-8')
-                    return {
-                        'success': True,
-                        'content': {
-                            'image_data': image_base64,
-                            'image_type': file_ext,
-                            'file_size': len(content),
-                            'note': 'Image file uploaded. OCR processing unavailable or failed.'
-                        },
-                        'metadata': {
-                            'file_name': file.filename,
-                            'file_size': len(content),
-                            'format': 'image',
-                            'image_type': file_ext,
-                            'processing_method': 'basic',
-                            'ocr_available': False
-                        },
-                        'processing_time': time.time() - start_time,
-                        'enhanced_processing': False
-                    }
-                except Exception as e:
-                    logger.error(f"Error processing image: {str(e)}")
-                    raise ValueError(f"Invalid image file: {str(e)}")
-
-            elif file_ext in ['xlsx', 'xls']:
-                try:
-                    # Read Excel content into pandas DataFrame
-                    df = pd.read_excel(pd.io.common.BytesIO(content))
-                    # Convert DataFrame to dict/list format
-                    return {
-                        'success': True,
-                        'content': df.to_dict(orient='records'),
-                        'metadata': {
-                            'file_name': file.filename,
-                            'file_size': len(content),
-                            'format': 'excel',
-                            'processing_method': 'basic',
-                            'rows': len(df),
-                            'columns': list(df.columns)
-                        },
-                        'processing_time': time.time() - start_time,
-                        'enhanced_processing': False
-                    }
-                except Exception as e:
-                    logger.error(f"Error processing Excel: {str(e)}")
-                    raise ValueError("Invalid Excel file")
+            handler = self._BASIC_HANDLERS.get(file_ext)
+            if handler is None:
+                raise ValueError(f"Unsupported file type: {file_ext}")
+            if handler is FileProcessor._process_image:
+                # OCR was already decided (and attempted) above; the image
+                # handler only reports the outcome
+                return await self._process_image(file, file_ext, file_size, content, start_time, include_raw_base64,
+                                                 ocr_skipped=ocr_skipped, docling_error=docling_error)
+            return await handler(self, file, file_ext, file_size, content, start_time, include_raw_base64)
 
-            elif file_ext in ['txt', 'md', 'rtf', 'html', 'xml', 'yaml', 'yml']:
-                try:
-                    # For text-based files, decode and return content
-                    text_content = content.decode('utf-8')
+        except Exception as e:
+            logger.error(f"Error processing file: {str(e)}")
+            raise
 
-                    return {
-                        'success': True,
-                        'content': {
-                            'text_content': text_content,
-                            'file_type': file_ext,
-                            'file_size': len(content),
-                            'character_count': len(text_content),
-                            'line_count': len(text_content.split('\n'))
-                        },
-                        'metadata': {
-                            'file_name': file.filename,
-                            'file_size': len(content),
-                            'format': 'text',
-                            'processing_method': 'basic',
-                            'character_count': len(text_content),
-                            'line_count': len(text_content.split('\n'))
-                        },
-                        'processing_time': time.time() - start_time,
-                        'enhanced_processing': False
-                    }
-                except Exception as e:
-                    logger.error(f"Error processing text file: {str(e)}")
-                    raise ValueError(f"Invalid text file: {str(e)}")
+    async def _process_json(self, file: UploadFile, file_ext: str, file_size: int, content: Optional[bytes],
+                            start_time: float, include_raw_base64: bool) -> Dict[str, Any]:
+        try:
+            data = await asyncio.to_thread(_json_loads, await file.read())
+        except json.JSONDecodeError as e:
+            logger.error(f"Error decoding JSON: {str(e)}")
+            raise ValueError("Invalid JSON file")
+        return _basic_result(data, _base_metadata(file.filename, file_size, 'json'), start_time)
+
+    async def _process_csv(self, file: UploadFile, file_ext: str, file_size: int, content: Optional[bytes],
+                           start_time: float, include_raw_base64: bool) -> Dict[str, Any]:
+        try:
+            # Read CSV content into dict/list format
+            records, columns = await self._parse_tabular(file, file_ext)
+        except Exception as e:
+            logger.error(f"Error processing CSV: {str(e)}")
+            raise ValueError("Invalid CSV file")
+        metadata = _base_metadata(file.filename, file_size, 'csv', rows=len(records), columns=columns)
+        return _basic_result(records, metadata, start_time)
 
-            elif file_ext in ['pdf', 'docx', 'doc', 'odt']:
-                try:
-                    # For document files, we'll store metadata and note that enhanced processing is recommended
-                    # Encode document as base64 for storage
-                    doc_base64 = base64.b64encode(content).decode('utf-8')
+    async def _process_excel(self, file: UploadFile, file_ext: str, file_size: int, content: Optional[bytes],
+                             start_time: float, include_raw_base64: bool) -> Dict[str, Any]:
+        try:
+            # Read Excel content into dict/list format
+            records, columns = await self._parse_tabular(file, file_ext)
+        except Exception as e:
+            logger.error(f"Error processing Excel: {str(e)}")
+            raise ValueError("Invalid Excel file")
+        metadata = _base_metadata(file.filename, file_size, 'excel', rows=len(records), columns=columns)
+        return _basic_result(records, metadata, start_time)
+
+    async def _process_image(self, file: UploadFile, file_ext: str, file_size: int, content: Optional[bytes],
+                             start_time: float, include_raw_base64: bool, ocr_skipped: bool = False,
+                             docling_error: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Basic result for an image that Docling did not handle.
 
-                    return {
-                        'success': True,
-                        'content': {
-                            'document_data': doc_base64,
-                            'document_type': file_ext,
-                            'file_size': len(content),
-                            'note': f'{file_ext.upper()} document uploaded. Enhanced processing (Docling) is recommended for better text extraction.'
-                        },
-                        'metadata': {
-                            'file_name': file.filename,
-                            'file_size': len(content),
-                            'format': 'document',
-                            'document_type': file_ext,
-                            'processing_method': 'basic',
-                            'enhanced_processing_recommended': True
-                        },
-                        'processing_time': time.time() - start_time,
-                        'enhanced_processing': False
-                    }
-                except Exception as e:
-                    logger.error(f"Error processing document: {str(e)}")
-                    raise ValueError(f"Invalid document file: {str(e)}")
+        process_file has already probed the image (ocr_skipped) and run any
+        Docling OCR (docling_error), so neither is repeated here.
+        """
+        if ocr_skipped:
+            note = 'Image file uploaded. OCR skipped: the image is too small or uniform to contain text.'
+        elif docling_error:
+            note = 'Image file uploaded. OCR processing failed.'
+        else:
+            note = 'Image file uploaded. OCR processing unavailable.'
+        try:
+            # Inline the image as base64 only for callers that asked for it
+            image_base64 = None
+            if include_raw_base64:
+                raw = content if content is not None else await file.read()
+                image_base64 = (await asyncio.to_thread(base64.b64encode, raw)).decode('ascii')
+        except Exception as e:
+            logger.error(f"Error processing image: {str(e)}")
+            raise ValueError(f"Invalid image file: {str(e)}")
+        result = _basic_result(
+            {
+                'image_data': image_base64,
+                'image_type': file_ext,
+                'file_size': file_size,
+                'note': note
+            },
+            _base_metadata(file.filename, file_size, 'image', image_type=file_ext,
+                           ocr_available=False),
+            start_time
+        )
+        if docling_error:
+            result['docling_error'] = docling_error
+        return result
 
-            else:
-                raise ValueError(f"Unsupported file type: {file_ext}")
+    async def _process_text(self, file: UploadFile, file_ext: str, file_size: int, content: Optional[bytes],
+                            start_time: float, include_raw_base64: bool) -> Dict[str, Any]:
+        try:
+            # For text-based files, decode and return content
+            raw = await file.read()
+            # Newlines are single bytes in UTF-8, so lines can be
+            # counted on the raw bytes (a memchr scan) before decoding
+            line_count = raw.count(b'\n') + 1
+            text_content = await asyncio.to_thread(raw.decode, 'utf-8')
+            del raw
+            character_count = len(text_content)
+        except Exception as e:
+            logger.error(f"Error processing text file: {str(e)}")
+            raise ValueError(f"Invalid text file: {str(e)}")
+        return _basic_result(
+            {
+                'text_content': text_content,
+                'file_type': file_ext,
+                'file_size': file_size,
+                'character_count': character_count,
+                'line_count': line_count
+            },
+            _base_metadata(file.filename, file_size, 'text',
+                           character_count=character_count, line_count=line_count),
+            start_time
+        )
 
+    async def _process_document(self, file: UploadFile, file_ext: str, file_size: int, content: Optional[bytes],
+                                start_time: float, include_raw_base64: bool) -> Dict[str, Any]:
+        try:
+            # For document files, we'll store metadata and note that enhanced processing is recommended
+            # Encode document as base64 only for callers that asked for it
+            doc_base64 = None
+            if include_raw_base64:
+                doc_base64 = (await asyncio.to_thread(base64.b64encode, content or await file.read())).decode('ascii')
         except Exception as e:
-            logger.error(f"Error processing file: {str(e)}")
-            raise
+            logger.error(f"Error processing document: {str(e)}")
+            raise ValueError(f"Invalid document file: {str(e)}")
+        return _basic_result(
+            {
+                'document_data': doc_base64,
+                'document_type': file_ext,
+                'file_size': file_size,
+                'note': f'{file_ext.upper()} document uploaded. Enhanced processing (Docling) is recommended for better text extraction.'
+            },
+            _base_metadata(file.filename, file_size, 'document', document_type=file_ext,
+                           enhanced_processing_recommended=True),
+            start_time
+        )
+
+    # Basic (non-Docling) handlers by file extension
+    _BASIC_HANDLERS = {
+        'json': _process_json,
+        'csv': _process_csv,
+        **dict.fromkeys(IMAGE_FORMATS, _process_image),
+        **dict.fromkeys(EXCEL_FORMATS, _process_excel),
+        **dict.fromkeys(TEXT_FORMATS, _process_text),
+        **dict.fromkeys(DOCUMENT_FORMATS, _process_document),
+    }
 
 async def process_file_content(data: Union[Dict[str, Any], List[Dict[str, Any]]], user_id: int, db: Session) -> int:
     """
@@ -877,18 +1402,14 @@ async def process_file_content(data: Union[Dict[str, Any], List[Dict[str, Any]]]
             content = "Uploaded file data"
             data_preview = data
 
-        # Create initial system message
-        chat_repo.add_message(
-            chat_id=chat_id,
-            role="system",
-            content=f"File upload processed. {content}."
-        )
-
-        # Create user message with file data
-        chat_repo.add_message(
+        # Create the initial system message and the user message with the
+        # file data in a single commit
+        chat_repo.add_messages(
             chat_id=chat_id,
-            role="user",
-            content=f"I've uploaded a file with the following data: {str(data_preview)}"
+            messages=[
+                ("system", f"File upload processed. {content}."),
+                ("user", f"I've uploaded a file with the following data: {_json_preview(data_preview)}")
+            ]
         )
 
         # Return the chat ID for redirecting the user
@@ -1,6 +1,11 @@
+import functools
+import hashlib
 import logging
-from pathlib import Path
-from typing import Optional, Dict
+import os
+import threading
+from typing import Optional, Dict, Tuple
+
+from .cache_service import partial_result_cache
 
 logger = logging.getLogger(__name__)
 
@@ -13,6 +18,79 @@ except ImportError as e:
     logger.error(f"Docling import failed: {e}")
     DOCLING_AVAILABLE = False
 
+# OCR configuration used when extract_markdown gets no ocr_options
+DEFAULT_OCR_CONFIG: Tuple[bool, Optional[Tuple[str, ...]]] = (True, None)
+
+# Markdown output is written in chunks of this size
+OUTPUT_WRITE_CHUNK_SIZE = 1 << 20  # 1 MiB
+
+# OCR results are cached by input content hash for this long
+OCR_CACHE_TTL = 3600  # seconds
+
+# Serialises first builds so concurrent callers don't construct (and load the
+# models for) the same converter twice
+_converter_lock = threading.Lock()
+
+
+def _build_pipeline_options(force_full_page_ocr: bool, lang: Optional[Tuple[str, ...]]) -> "PdfPipelineOptions":
+    """Build the PDF pipeline options for one OCR configuration."""
+    pipeline_options = PdfPipelineOptions()
+    pipeline_options.do_ocr = True
+    pipeline_options.do_table_structure = True
+    pipeline_options.table_structure_options.do_cell_matching = True
+    ocr_opts = TesseractCliOcrOptions(force_full_page_ocr=force_full_page_ocr)
+    if lang:
+        ocr_opts.lang = list(lang)
+    pipeline_options.ocr_options = ocr_opts
+    return pipeline_options
+
+
+# Built at import so a broken Docling install (e.g. incompatible options
+# models) shows up at startup rather than on the first OCR request
+_DEFAULT_PIPELINE_OPTIONS = _build_pipeline_options(*DEFAULT_OCR_CONFIG) if DOCLING_AVAILABLE else None
+
+
+@functools.lru_cache(maxsize=4)
+def _build_converter(force_full_page_ocr: bool, lang: Optional[Tuple[str, ...]]) -> "DocumentConverter":
+    """Build a Docling converter for one OCR configuration."""
+    if (force_full_page_ocr, lang) == DEFAULT_OCR_CONFIG:
+        pipeline_options = _DEFAULT_PIPELINE_OPTIONS
+    else:
+        pipeline_options = _build_pipeline_options(force_full_page_ocr, lang)
+    logger.info(f"Pipeline options: {pipeline_options}")
+    return DocumentConverter(
+        format_options={
+            InputFormat.PDF: PdfFormatOption(pipeline_options=pipeline_options)
+        }
+    )
+
+
+def _get_converter(force_full_page_ocr: bool, lang: Optional[Tuple[str, ...]]) -> "DocumentConverter":
+    """Return the cached converter for an OCR configuration, building it once."""
+    with _converter_lock:
+        return _build_converter(force_full_page_ocr, lang)
+
+def _file_sha256(path: str) -> str:
+    """SHA-256 of a file's contents, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(OUTPUT_WRITE_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _write_markdown(output_path: str, md: str) -> None:
+    """Write markdown to output_path as UTF-8 in fixed-size chunks."""
+    data = memoryview(md.encode("utf-8"))
+    fd = os.open(output_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        offset = 0
+        while offset < len(data):
+            # os.write may write less than asked; resume from where it stopped
+            offset += os.write(fd, data[offset:offset + OUTPUT_WRITE_CHUNK_SIZE])
+    finally:
+        os.close(fd)
+
 def extract_markdown(input_path: str, output_path: str, ocr_options: Optional[Dict] = None) -> bool:
     """
     Extracts markdown from a scanned document using Docling OCR and saves it to output_path.
@@ -23,31 +101,29 @@ def extract_markdown(input_path: str, output_path: str, ocr_options: Optional[Di
         logger.error("Docling is not available in the environment.")
         return False
     try:
-        pipeline_options = PdfPipelineOptions()
-        pipeline_options.do_ocr = True
-        pipeline_options.do_table_structure = True
-        pipeline_options.table_structure_options.do_cell_matching = True
         # Handle OCR options
-        ocr_opts = TesseractCliOcrOptions(force_full_page_ocr=True)
+        force_full_page_ocr, lang = DEFAULT_OCR_CONFIG
         if ocr_options:
             if ocr_options.get('force_full_page_ocr') is not None:
-                ocr_opts.force_full_page_ocr = ocr_options['force_full_page_ocr']
+                force_full_page_ocr = ocr_options['force_full_page_ocr']
             if ocr_options.get('lang'):
-                ocr_opts.lang = ocr_options['lang']
-        pipeline_options.ocr_options = ocr_opts
-        logger.info(f"Pipeline options: {pipeline_options}")
-        converter = DocumentConverter(
-            format_options={
-                InputFormat.PDF: PdfFormatOption(pipeline_options=pipeline_options)
-            }
-        )
-        logger.info("Running Docling converter...")
-        result = converter.convert(str(input_path))
-        doc = result.document
-        md = doc.export_to_markdown()
-        logger.info(f"Extracted markdown length: {len(md)}")
-        logger.info(f"Markdown preview: {md[:500]}")
-        Path(output_path).write_text(md, encoding="utf-8")
+                lang = tuple(ocr_options['lang'])
+        # Identical uploads with identical options reuse the earlier OCR run
+        digest = _file_sha256(str(input_path))
+        result_type = f"ocr_markdown:{int(force_full_page_ocr)}:{','.join(lang or ())}"
+        md = partial_result_cache.get(digest, result_type)
+        if md is not None:
+            logger.info(f"OCR cache hit for {input_path} (sha256={digest})")
+        else:
+            converter = _get_converter(force_full_page_ocr, lang)
+            logger.info("Running Docling converter...")
+            result = converter.convert(str(input_path))
+            doc = result.document
+            md = doc.export_to_markdown()
+            logger.info(f"Extracted markdown length: {len(md)}")
+            logger.info(f"Markdown preview: {md[:500]}")
+            partial_result_cache.set(digest, result_type, md, ttl=OCR_CACHE_TTL)
+        _write_markdown(str(output_path), md)
         logger.info(f"Markdown extraction successful: {output_path}")
         return True
     except Exception as e:
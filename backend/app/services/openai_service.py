@@ -2,11 +2,16 @@ from openai import OpenAI
 import logging
 import json
 import asyncio
-from typing import Dict, Any, List, Optional
+import hashlib
+from typing import Dict, Any, List, Optional, Tuple
 import re
+import types
 from datetime import datetime
 import time
 from ..core.config import settings
+from .cache_service import response_cache, semantic_cache
+
+logger = logging.getLogger(__name__)
 
 # Profile-specific prompt templates
 PROFILE_PROMPT_TEMPLATES = {
@@ -117,34 +122,208 @@ PROFILE_PROMPT_TEMPLATES = {
 ## Answer:''',
 }
 
+
+def _split_profile_template(template: str) -> Tuple[str, str, str]:
+    """Split a template into the text before {document_context}, between it and {question}, and after"""
+    before_context, rest = template.split("{document_context}", 1)
+    between, after_question = rest.split("{question}", 1)
+    return before_context, between, after_question
+
+
+# PROFILE_PROMPT_TEMPLATES pre-sliced at import; render_profile_prompt joins
+# the fixed parts around the inputs instead of parsing the template per request
+PROFILE_PROMPT_PARTS = {
+    profile: _split_profile_template(template)
+    for profile, template in PROFILE_PROMPT_TEMPLATES.items()
+}
+
+# Persona system messages for chat_with_context, one constant string per profile
+PROFILE_SYSTEM_MESSAGES = types.MappingProxyType({
+    "real_estate": "You are a real estate expert specializing in property data analysis, market trends, and investment insights.",
+    "legal": "You are a legal expert specializing in legal document analysis, case law research, and legal data interpretation.",
+    "finance": "You are a finance expert specializing in financial analysis, market data interpretation, and investment research.",
+    "medical": "You are a medical data expert specializing in healthcare analytics, medical research data, and clinical insights.",
+    "insurance": "You are an insurance expert specializing in risk analysis, claims data, and insurance market trends.",
+    "management": "You are a business management expert specializing in performance metrics, operational data analysis, and strategic insights."
+})
+DEFAULT_SYSTEM_MESSAGE = "You are a helpful AI assistant specializing in data analysis and providing insights."
+
+# Phrases in an LLM reply that mean it could not answer from its context
+NO_INFO_PATTERNS = (
+    "i'm unable to provide",
+    "i don't have access to",
+    "i cannot provide",
+    "i'm unable to access",
+    "i don't have information",
+    "i cannot access",
+    "i'm not able to provide",
+    "i don't have real-time",
+    "i cannot provide real-time",
+    "i'm unable to provide real-time",
+    "i don't have current",
+    "i cannot provide current",
+    "i'm unable to provide current",
+    "i don't have live",
+    "i cannot provide live",
+    "i'm unable to provide live",
+    "i don't have access to the internet",
+    "i cannot access the internet",
+    "i'm unable to access the internet",
+    "i don't have web access",
+    "i cannot access web",
+    "i'm unable to access web",
+    "i don't have internet access",
+    "i cannot access internet",
+    "i'm unable to access internet",
+)
+
+# Keywords in a user question that indicate need for current/live data
+TAVILY_KEYWORDS = (
+    "current stock",
+    "stock price",
+    "stock performance",
+    "current price",
+    "market price",
+    "ticker",
+    "current weather",
+    "weather in",
+    "current news",
+    "latest news",
+    "breaking news",
+    "current state",
+    "current status",
+    "live data",
+    "real-time",
+    "current market",
+    "market performance",
+    "current events",
+    "today's",
+    "this week",
+    "this month",
+    "recent",
+    "latest",
+    "current",
+    "now",
+    "today",
+    "yesterday",
+    "tomorrow",
+)
+
+# Common stock tickers
+COMMON_TICKERS = frozenset({'GOOG', 'AAPL', 'MSFT', 'AMZN', 'TSLA', 'META', 'NVDA', 'NFLX', 'GOOGL', 'BRK.A', 'BRK.B'})
+
+# Each phrase list is matched in one case-insensitive pass over the text
+_NO_INFO_RE = re.compile("|".join(map(re.escape, NO_INFO_PATTERNS)), re.IGNORECASE)
+# Keywords and whole-word tickers share one automaton, so a question is
+# classified in a single scan. Only tickers a 2-5 letter word can spell are
+# included, matching what ticker detection has always recognised.
+_TAVILY_TRIGGER_RE = re.compile(
+    "|".join(map(re.escape, TAVILY_KEYWORDS))
+    + r"|\b(?:"
+    + "|".join(sorted((t for t in COMMON_TICKERS if re.fullmatch(r"[A-Z]{2,5}", t)), key=lambda t: (-len(t), t)))
+    + r")\b",
+    re.IGNORECASE,
+)
+
+# Completions at or below this temperature are treated as deterministic and
+# served from response_cache on an exact repeat of the request
+RESPONSE_CACHE_MAX_TEMPERATURE = 0.2
+RESPONSE_CACHE_TTL = 3600
+# An uploaded file is re-summarized on every follow-up question about it,
+# so summaries are kept for a day
+SUMMARY_CACHE_TTL = 86400
+
+# File context beyond this many characters is not sent to the model
+CONTEXT_MAX_CHARS = 5000
+
+
+def _context_text(context_data) -> str:
+    """Render context_data for the prompt, building at most CONTEXT_MAX_CHARS."""
+    if not context_data:
+        return ""
+    if isinstance(context_data, str):
+        return context_data[:CONTEXT_MAX_CHARS]
+    # Encode incrementally so a large dict is never stringified in full
+    parts = []
+    size = 0
+    for chunk in json.JSONEncoder(default=str).iterencode(context_data):
+        parts.append(chunk)
+        size += len(chunk)
+        if size >= CONTEXT_MAX_CHARS:
+            break
+    return "".join(parts)[:CONTEXT_MAX_CHARS]
+
+
+# Upper bound on in-flight completions for one summarize_chunks call
+SUMMARY_MAX_CONCURRENCY = 20
+
+
+def _response_cache_key(model, messages, max_tokens, temperature) -> Optional[str]:
+    """SHA-256 of the request, or None when the completion is not cacheable."""
+    if temperature > RESPONSE_CACHE_MAX_TEMPERATURE:
+        return None
+    payload = json.dumps(
+        {"model": model, "messages": messages, "max_tokens": max_tokens, "temperature": temperature},
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+# AsyncOpenAI client shared by every OpenAIService (routers build one per
+# request), created on first use so its connection pool outlives requests
+_async_client = None
+
+
+def _get_async_client():
+    """Return the shared AsyncOpenAI client, creating it on first use."""
+    global _async_client
+    if _async_client is None:
+        _async_client = settings.get_async_openai_client()
+    return _async_client
+
+
 class OpenAIService:
     """Service for interacting with OpenAI APIs"""
 
     def __init__(self):
         self.client = settings.get_openai_client()
+        self.async_client = _get_async_client()
         self.current_profile = None
 
-    def chat_completion(self, messages, model=None, max_tokens=1000):
+    def chat_completion(self, messages, model=None, max_tokens=1000, temperature=0.7, cache_ttl=RESPONSE_CACHE_TTL):
         """Generate a chat completion response from OpenAI"""
         if model is None:
             model = settings.OPENAI_MODEL
+        cache_key = _response_cache_key(model, messages, max_tokens, temperature)
+        if cache_key:
+            cached = response_cache.get(cache_key)
+            if cached is not None:
+                return cached
         try:
             response = self.client.chat.completions.create(
                 model=model,
                 messages=messages,
                 max_tokens=max_tokens,
-                temperature=0.7
+                temperature=temperature
             )
 
             if response.choices and response.choices[0].message:
-                return response.choices[0].message.content
+                content = response.choices[0].message.content
+                if cache_key and content is not None:
+                    response_cache.set(cache_key, content, ttl=cache_ttl)
+                return content
             return "I apologize, but I'm having trouble generating a response right now."
 
         except Exception as e:
-            # Check if it's a quota exceeded error
-            if "insufficient_quota" in str(e) or "429" in str(e):
-                return self._generate_fallback_response(messages)
-            return f"I apologize, but I'm experiencing technical difficulties: {str(e)}"
+            return self._completion_error_response(e, messages)
+
+    def _completion_error_response(self, e: Exception, messages) -> str:
+        """Turn a failed completion into a user-facing message"""
+        # Check if it's a quota exceeded error
+        if "insufficient_quota" in str(e) or "429" in str(e):
+            return self._generate_fallback_response(messages)
+        return f"I apologize, but I'm experiencing technical difficulties: {str(e)}"
 
     def _generate_fallback_response(self, messages):
         """Generate a fallback response when OpenAI quota is exceeded"""
@@ -168,30 +347,76 @@ class OpenAIService:
         except Exception:
             return "I apologize, but I'm experiencing technical difficulties. Please try again later."
 
-    async def generate_response(self, messages, model=None, max_tokens=1000):
+    async def generate_response(self, messages, model=None, max_tokens=1000, temperature=0.7, cache_ttl=RESPONSE_CACHE_TTL):
         """Generate a chat completion response from OpenAI (async version)"""
         if model is None:
             model = settings.OPENAI_MODEL
-        return self.chat_completion(messages, model, max_tokens)
+        cache_key = _response_cache_key(model, messages, max_tokens, temperature)
+        if cache_key:
+            cached = response_cache.get(cache_key)
+            if cached is not None:
+                return cached
+        try:
+            response = await self.async_client.chat.completions.create(
+                model=model,
+                messages=messages,
+                max_tokens=max_tokens,
+                temperature=temperature
+            )
+
+            if response.choices and response.choices[0].message:
+                content = response.choices[0].message.content
+                if cache_key and content is not None:
+                    response_cache.set(cache_key, content, ttl=cache_ttl)
+                return content
+            return "I apologize, but I'm having trouble generating a response right now."
+
+        except Exception as e:
+            return self._completion_error_response(e, messages)
+
+    def _analysis_messages(self, data, analysis_prompt) -> List[Dict[str, str]]:
+        """Build the system + user messages for a data analysis request"""
+        system_message = {
+            "role": "system",
+            "content": "You are a data analysis expert. Analyze the following data and provide clear, actionable insights. Focus on patterns, trends, and key findings."
+        }
+
+        user_message = {
+            "role": "user",
+            "content": f"{analysis_prompt}\n\nDATA TO ANALYZE:\n{data}"
+        }
+
+        return [system_message, user_message]
 
     def analyze_data(self, data, analysis_prompt, model=None):
         """Analyze data using OpenAI"""
         if model is None:
             model = settings.OPENAI_MODEL
         try:
-            system_message = {
-                "role": "system",
-                "content": "You are a data analysis expert. Analyze the following data and provide clear, actionable insights. Focus on patterns, trends, and key findings."
-            }
+            messages = self._analysis_messages(data, analysis_prompt)
 
-            user_message = {
-                "role": "user",
-                "content": f"{analysis_prompt}\n\nDATA TO ANALYZE:\n{data}"
-            }
+            response = self.client.chat.completions.create(
+                model=model,
+                messages=messages,
+                max_tokens=2000,
+                temperature=0.3
+            )
 
-            messages = [system_message, user_message]
+            if response.choices and response.choices[0].message:
+                return response.choices[0].message.content
+            return "I encountered an issue while analyzing your data. Please try again."
 
-            response = self.client.chat.completions.create(
+        except Exception as e:
+            return f"I apologize, but I encountered an error while analyzing your data: {str(e)}"
+
+    async def aanalyze_data(self, data, analysis_prompt, model=None):
+        """Analyze data using OpenAI (async version)"""
+        if model is None:
+            model = settings.OPENAI_MODEL
+        try:
+            messages = self._analysis_messages(data, analysis_prompt)
+
+            response = await self.async_client.chat.completions.create(
                 model=model,
                 messages=messages,
                 max_tokens=2000,
@@ -213,77 +438,187 @@ class OpenAIService:
         """Get the appropriate prompt template for a given profile"""
         return PROFILE_PROMPT_TEMPLATES.get(profile, PROFILE_PROMPT_TEMPLATES["default"])
 
+    def render_profile_prompt(self, profile: str, document_context: str, question: str) -> str:
+        """Fill the profile's precompiled prompt template with the document context and question"""
+        before_context, between, after_question = PROFILE_PROMPT_PARTS.get(profile, PROFILE_PROMPT_PARTS["default"])
+        return "".join((before_context, document_context, between, question, after_question))
+
+    def _build_context_messages(self, messages, context_text="", profile=None, user_question=None):
+        """
+        Build the message list for chat_with_context from the already-capped context text.
+
+        Returns:
+            Tuple of (history as dicts, full message list to send)
+        """
+        # Defensive: ensure all messages are dicts, not ORM objects
+        def to_dict(m):
+            if isinstance(m, dict):
+                return m
+            return {"role": getattr(m, "role", None), "content": getattr(m, "content", None)}
+        if messages:
+            messages = [to_dict(m) for m in messages]
+
+        logger.debug("chat_with_context called with profile=%s, user_question=%s", profile, user_question)
+        logger.debug("Context text length: %d", len(context_text))
+
+        # Order from most to least stable so the provider's prompt cache can reuse
+        # the longest prefix: constant profile persona, then the document (same
+        # for every turn of a chat), then history, then the new question
+        if profile:
+            system_content = self.get_system_message_for_profile(profile)
+        else:
+            system_content = DEFAULT_SYSTEM_MESSAGE
+        full_messages = [{"role": "system", "content": system_content}]
+        if context_text:
+            document_id = hashlib.sha256(context_text.encode("utf-8")).hexdigest()[:16]
+            full_messages.append({
+                "role": "system",
+                "content": f"DOCUMENT_ID={document_id}\nYou have access to the following file data:\n{context_text}"
+            })
+
+        # Build full message list: system + chat history + new user message
+        if messages:
+            full_messages.extend(messages)
+        if user_question:
+            full_messages.append({"role": "user", "content": user_question})
+
+        logger.debug("Calling OpenAI API with %d messages", len(full_messages))
+        logger.debug("LLM prompt (first 500 chars): %.500s", full_messages[0]['content'])
+        return messages, full_messages
+
+    def _context_response_text(self, response) -> str:
+        """Extract the reply from a chat_with_context completion"""
+        if response.choices and response.choices[0].message:
+            result = response.choices[0].message.content
+            logger.debug("OpenAI API call successful, response length: %d", len(result))
+            return result
+        logger.debug("OpenAI API call returned no choices")
+        return "I apologize, but I'm having trouble generating a response right now."
+
+    def _context_error_response(self, e: Exception, messages) -> str:
+        """Turn a failed chat_with_context completion into a user-facing message"""
+        logger.debug("Exception in chat_with_context: %s: %s", type(e).__name__, e)
+        # Check if it's a quota exceeded error
+        if "insufficient_quota" in str(e) or "429" in str(e):
+            logger.debug("Detected quota error, using fallback response")
+            return self._generate_fallback_response(messages)
+        logger.debug("Not a quota error, returning generic error message")
+        return f"I apologize, but I'm experiencing technical difficulties: {str(e)}"
+
+    def _semantic_context_hash(self, model, context_text, profile) -> str:
+        """Hash everything except the question that shapes a first-turn chat_with_context answer"""
+        payload = json.dumps(
+            {
+                "model": model,
+                "profile": profile,
+                "context": context_text,
+            },
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _embedding_from_response(self, response) -> List[float]:
+        return response.data[0].embedding
+
+    def _embed_question(self, question: str) -> Optional[List[float]]:
+        """Embed a user question for the semantic cache; None if embedding fails"""
+        try:
+            response = self.client.embeddings.create(model=settings.OPENAI_EMBEDDING_MODEL, input=question)
+            return self._embedding_from_response(response)
+        except Exception as e:
+            logger.warning("Question embedding failed, skipping semantic cache: %s", e)
+            return None
+
+    async def _aembed_question(self, question: str) -> Optional[List[float]]:
+        """Async version of _embed_question"""
+        try:
+            response = await self.async_client.embeddings.create(model=settings.OPENAI_EMBEDDING_MODEL, input=question)
+            return self._embedding_from_response(response)
+        except Exception as e:
+            logger.warning("Question embedding failed, skipping semantic cache: %s", e)
+            return None
+
+    def _cache_context_response(self, response, vector, context_hash, result: str):
+        """Store a successful chat_with_context answer in the semantic cache"""
+        if vector is not None and response.choices and response.choices[0].message:
+            semantic_cache.set(vector, context_hash, result)
+
     def chat_with_context(self, messages, context_data=None, profile=None, user_question=None, model=None, max_tokens=1500):
         """Generate a chat response with additional context and profile using rich prompt templates"""
         if model is None:
             model = settings.OPENAI_MODEL
         try:
-            # Defensive: ensure all messages are dicts, not ORM objects
-            def to_dict(m):
-                if isinstance(m, dict):
-                    return m
-                return {"role": getattr(m, "role", None), "content": getattr(m, "content", None)}
-            if messages:
-                messages = [to_dict(m) for m in messages]
-
-            print(f"[DEBUG] chat_with_context called with profile={profile}, user_question={user_question}")
-            print(f"[DEBUG] Context data type: {type(context_data)}")
-            print(f"[DEBUG] Context data length: {len(str(context_data)) if context_data else 0}")
-
-            # Always build a system message with profile and file context (if any)
-            if profile:
-                system_content = self.get_system_message_for_profile(profile)
-            else:
-                system_content = "You are a helpful AI assistant specializing in data analysis and providing insights."
-            if context_data:
-                system_content += f"\n\nYou have access to the following file data:\n{str(context_data)[:5000]}"
-            system_message = {"role": "system", "content": system_content}
-
-            # Build full message list: system + chat history + new user message
-            full_messages = [system_message]
-            if messages:
-                full_messages.extend(messages)
-            if user_question:
-                full_messages.append({"role": "user", "content": user_question})
-
-            print(f"[DEBUG] Using unified prompt logic (system + history + user)")
-            print(f"[DEBUG] Calling OpenAI API with {len(full_messages)} messages")
-            if full_messages and 'content' in full_messages[0]:
-                print(f"[DEBUG] LLM prompt (first 500 chars): {full_messages[0]['content'][:500]}")
+            context_text = _context_text(context_data)
+            messages, full_messages = self._build_context_messages(messages, context_text, profile, user_question)
+            # Only a chat's opening question can match an earlier answer; later
+            # turns depend on their history, so skip the embedding round trip
+            vector = self._embed_question(user_question) if user_question and not messages else None
+            context_hash = None
+            if vector is not None:
+                context_hash = self._semantic_context_hash(model, context_text, profile)
+                cached = semantic_cache.get(vector, context_hash)
+                if cached is not None:
+                    return cached
             response = self.client.chat.completions.create(
                 model=model,
                 messages=full_messages,
                 max_tokens=max_tokens,
                 temperature=0.7
             )
+            result = self._context_response_text(response)
+            self._cache_context_response(response, vector, context_hash, result)
+            return result
 
-            if response.choices and response.choices[0].message:
-                result = response.choices[0].message.content
-                print(f"[DEBUG] OpenAI API call successful, response length: {len(result)}")
-                return result
-            print(f"[DEBUG] OpenAI API call returned no choices")
-            return "I apologize, but I'm having trouble generating a response right now."
+        except Exception as e:
+            return self._context_error_response(e, messages)
+
+    async def achat_with_context(self, messages, context_data=None, profile=None, user_question=None, model=None, max_tokens=1500):
+        """Generate a chat response with additional context and profile (async version)"""
+        if model is None:
+            model = settings.OPENAI_MODEL
+        try:
+            context_text = _context_text(context_data)
+            messages, full_messages = self._build_context_messages(messages, context_text, profile, user_question)
+            # Only a chat's opening question can match an earlier answer; later
+            # turns depend on their history, so skip the embedding round trip
+            vector = await self._aembed_question(user_question) if user_question and not messages else None
+            context_hash = None
+            if vector is not None:
+                context_hash = self._semantic_context_hash(model, context_text, profile)
+                cached = semantic_cache.get(vector, context_hash)
+                if cached is not None:
+                    return cached
+            response = await self.async_client.chat.completions.create(
+                model=model,
+                messages=full_messages,
+                max_tokens=max_tokens,
+                temperature=0.7
+            )
+            result = self._context_response_text(response)
+            self._cache_context_response(response, vector, context_hash, result)
+            return result
 
         except Exception as e:
-            print(f"[DEBUG] Exception in chat_with_context: {type(e).__name__}: {str(e)}")
-            # Check if it's a quota exceeded error
-            if "insufficient_quota" in str(e) or "429" in str(e):
-                print(f"[DEBUG] Detected quota error, using fallback response")
-                return self._generate_fallback_response(messages)
-            print(f"[DEBUG] Not a quota error, returning generic error message")
-            return f"I apologize, but I'm experiencing technical difficulties: {str(e)}"
+            return self._context_error_response(e, messages)
 
     def get_system_message_for_profile(self, profile: str) -> str:
         """Get the appropriate system message for a given profile (legacy)"""
-        profiles = {
-            "real_estate": "You are a real estate expert specializing in property data analysis, market trends, and investment insights.",
-            "legal": "You are a legal expert specializing in legal document analysis, case law research, and legal data interpretation.",
-            "finance": "You are a finance expert specializing in financial analysis, market data interpretation, and investment research.",
-            "medical": "You are a medical data expert specializing in healthcare analytics, medical research data, and clinical insights.",
-            "insurance": "You are an insurance expert specializing in risk analysis, claims data, and insurance market trends.",
-            "management": "You are a business management expert specializing in performance metrics, operational data analysis, and strategic insights."
-        }
-        return profiles.get(profile, "You are a helpful AI assistant specializing in data analysis and providing insights.")
+        return PROFILE_SYSTEM_MESSAGES.get(profile, DEFAULT_SYSTEM_MESSAGE)
+
+    def _matches_no_info_pattern(self, response: str) -> bool:
+        """Check a response for common phrases that indicate no information"""
+        return _NO_INFO_RE.search(response) is not None
+
+    def _no_info_check_messages(self, response: str) -> List[Dict[str, str]]:
+        """Build the yes/no classification prompt for is_no_info_response_llm"""
+        prompt = (
+            "Does the following response indicate that you do not have enough information to answer the user's question? "
+            "Look for phrases like 'unable to provide', 'don't have access', 'cannot provide', etc. "
+            "Respond with 'yes' or 'no'.\n\n"
+            f"Response:\n{response}"
+        )
+        return [{"role": "user", "content": prompt}]
 
     def is_no_info_response_llm(self, response: str) -> bool:
         """
@@ -291,68 +626,79 @@ class OpenAIService:
         Returns True if the LLM says the response is a 'no information' answer.
         """
         # First, check for common patterns that indicate no information
-        no_info_patterns = [
-            "i'm unable to provide",
-            "i don't have access to",
-            "i cannot provide",
-            "i'm unable to access",
-            "i don't have information",
-            "i cannot access",
-            "i'm not able to provide",
-            "i don't have real-time",
-            "i cannot provide real-time",
-            "i'm unable to provide real-time",
-            "i don't have current",
-            "i cannot provide current",
-            "i'm unable to provide current",
-            "i don't have live",
-            "i cannot provide live",
-            "i'm unable to provide live",
-            "i don't have access to the internet",
-            "i cannot access the internet",
-            "i'm unable to access the internet",
-            "i don't have web access",
-            "i cannot access web",
-            "i'm unable to access web",
-            "i don't have internet access",
-            "i cannot access internet",
-            "i'm unable to access internet"
-        ]
-
-        response_lower = response.lower()
-        for pattern in no_info_patterns:
-            if pattern in response_lower:
-                return True
+        if self._matches_no_info_pattern(response):
+            return True
 
         # If no patterns match, use LLM to check
         try:
-            prompt = (
-                "Does the following response indicate that you do not have enough information to answer the user's question? "
-                "Look for phrases like 'unable to provide', 'don't have access', 'cannot provide', etc. "
-                "Respond with 'yes' or 'no'.\n\n"
-                f"Response:\n{response}"
+            # One token at temperature 0 on the cheap model; repeats of the same
+            # response are answered from response_cache
+            result = self.chat_completion(
+                self._no_info_check_messages(response),
+                model=settings.OPENAI_CLASSIFIER_MODEL,
+                max_tokens=1,
+                temperature=0
             )
-            result = self.chat_completion([{"role": "user", "content": prompt}], max_tokens=3)
             return result.strip().lower().startswith("y")
         except Exception as e:
             # If LLM check fails, default to False to avoid unnecessary Tavily calls
             return False
 
-    def summarize_text(self, text: str, max_tokens: int = 400) -> str:
-        """Summarize a long text using the LLM for context-passing."""
+    async def ais_no_info_response_llm(self, response: str) -> bool:
+        """Async version of is_no_info_response_llm, so several checks can run under asyncio.gather"""
+        if self._matches_no_info_pattern(response):
+            return True
+
+        try:
+            result = await self.generate_response(
+                self._no_info_check_messages(response),
+                model=settings.OPENAI_CLASSIFIER_MODEL,
+                max_tokens=1,
+                temperature=0
+            )
+            return result.strip().lower().startswith("y")
+        except Exception as e:
+            # If LLM check fails, default to False to avoid unnecessary Tavily calls
+            return False
+
+    def _summarize_messages(self, text: str) -> List[Dict[str, str]]:
+        """Build the summarization prompt for summarize_text"""
         prompt = (
             "Summarize the following document content in a concise, factual way, preserving key details, data, and structure. "
             "Focus on the most important points, and keep the summary under 400 words.\n\nCONTENT:\n" + text
         )
-        messages = [
+        return [
             {"role": "system", "content": "You are an expert document summarizer."},
             {"role": "user", "content": prompt}
         ]
+
+    def summarize_text(self, text: str, max_tokens: int = 400) -> str:
+        """Summarize a long text using the LLM for context-passing."""
         try:
-            return self.chat_completion(messages, max_tokens=max_tokens)
+            return self.chat_completion(self._summarize_messages(text), max_tokens=max_tokens, temperature=0.2,
+                                        cache_ttl=SUMMARY_CACHE_TTL)
         except Exception as e:
             return f"[SUMMARY ERROR: {str(e)}]"
 
+    async def asummarize_text(self, text: str, max_tokens: int = 400) -> str:
+        """Summarize a long text using the LLM for context-passing (async version)."""
+        try:
+            return await self.generate_response(self._summarize_messages(text), max_tokens=max_tokens, temperature=0.2,
+                                                cache_ttl=SUMMARY_CACHE_TTL)
+        except Exception as e:
+            return f"[SUMMARY ERROR: {str(e)}]"
+
+    async def summarize_chunks(self, chunks: List[str], max_tokens: int = 400,
+                               max_concurrency: int = SUMMARY_MAX_CONCURRENCY) -> List[str]:
+        """Summarize several chunks concurrently; results keep the order of chunks."""
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def summarize_one(chunk: str) -> str:
+            async with semaphore:
+                return await self.asummarize_text(chunk, max_tokens=max_tokens)
+
+        return await asyncio.gather(*(summarize_one(chunk) for chunk in chunks))
+
     def should_trigger_tavily_directly(self, user_question: str) -> bool:
         """
         Check if a user question should directly trigger Tavily web search.
@@ -361,52 +707,5 @@ class OpenAIService:
         if not user_question:
             return False
 
-        question_lower = user_question.lower()
-
-        # Keywords that indicate need for current/live data
-        tavily_keywords = [
-            "current stock",
-            "stock price",
-            "stock performance",
-            "current price",
-            "market price",
-            "ticker",
-            "current weather",
-            "weather in",
-            "current news",
-            "latest news",
-            "breaking news",
-            "current state",
-            "current status",
-            "live data",
-            "real-time",
-            "current market",
-            "market performance",
-            "current events",
-            "today's",
-            "this week",
-            "this month",
-            "recent",
-            "latest",
-            "current",
-            "now",
-            "today",
-            "yesterday",
-            "tomorrow"
-        ]
-
-        # Check for stock ticker patterns (like GOOG, AAPL, etc.)
-        import re
-        ticker_pattern = r'\b[A-Z]{2,5}\b'
-        tickers = re.findall(ticker_pattern, user_question.upper())
-
-        # Common stock tickers
-        common_tickers = ['GOOG', 'AAPL', 'MSFT', 'AMZN', 'TSLA', 'META', 'NVDA', 'NFLX', 'GOOGL', 'BRK.A', 'BRK.B']
-
-        # Check if any common tickers are mentioned
-        has_ticker = any(ticker in common_tickers for ticker in tickers)
-
-        # Check for tavily keywords
-        has_tavily_keyword = any(keyword in question_lower for keyword in tavily_keywords)
-
-        return has_ticker or has_tavily_keyword
\ No newline at end of file
+        # Tavily keywords or common tickers (like GOOG, AAPL, etc.)
+        return _TAVILY_TRIGGER_RE.search(user_question) is not None
\ No newline at end of file
@@ -1,7 +1,8 @@
 # app/services/supabase_service.py
+import asyncio
 import logging
 from typing import Optional, Dict, Any
-from supabase import create_client, Client
+from supabase import create_async_client, AsyncClient
 from ..core.config import settings
 
 logger = logging.getLogger(__name__)
@@ -10,35 +11,47 @@ class SupabaseService:
     """Service for interacting with Supabase admin functions"""
     
     def __init__(self):
-        self.client: Optional[Client] = None
+        self.client: Optional[AsyncClient] = None
+        self.enabled = False
+        self._client_lock: Optional[asyncio.Lock] = None
         self._initialize_client()
     
     def _initialize_client(self):
-        """Initialize Supabase client with service key for admin operations"""
-        try:
-            if settings.SUPABASE_ENABLED:
-                self.client = create_client(
-                    settings.SUPABASE_URL, 
-                    settings.SUPABASE_SERVICE_KEY
-                )
-                logger.info("Supabase admin client initialized successfully")
-            else:
-                logger.warning("Supabase is disabled. Client not initialized.")
-        except Exception as e:
-            logger.error(f"Failed to initialize Supabase client: {str(e)}")
-            self.client = None
-    
-    
+        """Check Supabase config; the async admin client itself is created on first use"""
+        if settings.SUPABASE_ENABLED:
+            self.enabled = True
+        else:
+            logger.warning("Supabase is disabled. Client not initialized.")
+
+    async def _aclient(self) -> Optional[AsyncClient]:
+        """Return the shared async admin client, creating it once per process"""
+        if self.client or not self.enabled:
+            return self.client
+        if self._client_lock is None:
+            self._client_lock = asyncio.Lock()
+        async with self._client_lock:
+            if self.client is None:
+                try:
+                    self.client = await create_async_client(
+                        settings.SUPABASE_URL,
+                        settings.SUPABASE_SERVICE_KEY
+                    )
+                    logger.info("Supabase admin client initialized successfully")
+                except Exception as e:
+                    logger.error(f"Failed to initialize Supabase client: {str(e)}")
+                    self.client = None
+        return self.client
     
     async def update_user_metadata(self, user_id: str, metadata_updates: Dict[str, Any]) -> bool:
         """Update user metadata in Supabase auth"""
-        if not self.client:
+        client = await self._aclient()
+        if not client:
             logger.warning("Supabase client not available. Skipping metadata update.")
             return False
         
         try:
             # Update user metadata using admin client
-            response = self.client.auth.admin.update_user_by_id(
+            response = await client.auth.admin.update_user_by_id(
                 user_id,
                 {
                     "user_metadata": metadata_updates
@@ -1,16 +1,133 @@
 import os
+import asyncio
+import httpx
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import json
+import hashlib
 import logging
 from typing import Dict, Any, List, Optional
 from datetime import datetime
 import time
+import threading
 from ..core.config import settings
+from .cache_service import search_cache
+
+# orjson decodes search payloads faster; its JSONDecodeError subclasses
+# ValueError like the stdlib one, so error handling is the same either way
+try:
+    from orjson import loads as _json_loads
+except ImportError:
+    from json import loads as _json_loads
 
 logger = logging.getLogger(__name__)
 
+TAVILY_SEARCH_URL = "https://api.tavily.com/search"
+# The startup probe runs in the background and gives up quickly
+TAVILY_HEALTH_CHECK_TIMEOUT = 5
+
+# Live-data searches recur across users within minutes; a short TTL keeps
+# "today's" answers fresh while absorbing the repeats
+TAVILY_CACHE_TTL = 60
+
+
+# (search_depth, max_results) per profile; research-heavy profiles pay for a
+# deeper search up front instead of a follow-up round trip
+TAVILY_PROFILE_SEARCH = {
+    "finance": ("advanced", 8),
+    "legal": ("advanced", 8),
+}
+TAVILY_DEFAULT_SEARCH = ("basic", 3)
+
+# One formatted entry in the "Sources and Additional Details" list
+_SOURCE_TEMPLATE = "\n{index}. **{title}**\n   {content}{source}"
+
+# Results Tavily scores at or below this are left out of the formatted answer
+TAVILY_MIN_RESULT_SCORE = 0.5
+
+
+def _search_options(profile: Optional[str], max_results: Optional[int]):
+    """Pick search depth and result count for a profile, honouring an explicit max_results"""
+    depth, default_results = TAVILY_PROFILE_SEARCH.get(profile, TAVILY_DEFAULT_SEARCH)
+    return depth, max_results or default_results
+
+
+def _search_cache_key(query: str, depth: str, max_results: int) -> str:
+    normalized = " ".join(query.lower().split())
+    return hashlib.sha256(f"{normalized}|{depth}|{max_results}".encode("utf-8")).hexdigest()
+
+
+def _cached_search(query: str, depth: str, max_results: int):
+    """Return (cache key, cached Tavily response or None)"""
+    key = _search_cache_key(query, depth, max_results)
+    cached = search_cache.get(key)
+    if cached is not None:
+        logger.info(f"Tavily cache hit (hits={search_cache.hits}, misses={search_cache.misses})")
+    return key, cached
+
+
+def _decode_search_response(content: bytes) -> Dict[str, Any]:
+    """Parse a Tavily response body, raising ValueError unless it is a JSON object"""
+    result = _json_loads(content)
+    if not isinstance(result, dict):
+        raise ValueError(f"expected a JSON object, got {type(result).__name__}")
+    return result
+
+
+def _log_invalid_response(error: ValueError, content: bytes):
+    logger.error(f"Tavily returned an invalid response: {error}; body starts with {content[:200]!r}")
+
+
+def _store_search(key: str, result: Dict[str, Any]):
+    if result:
+        search_cache.set(key, result, ttl=TAVILY_CACHE_TTL)
+
+
+def _build_session() -> requests.Session:
+    """Session with a keep-alive pool so repeat searches skip the TCP/TLS handshake"""
+    session = requests.Session()
+    retries = Retry(
+        total=2,
+        backoff_factor=0.2,
+        status_forcelist=[429, 500, 502, 503, 504],
+        # Search requests are read-only, so retrying the POST is safe
+        allowed_methods=frozenset({"POST"}),
+    )
+    session.mount("https://", HTTPAdapter(pool_connections=50, pool_maxsize=1000, max_retries=retries))
+    return session
+
+
+def _merge_search_responses(primary: Dict[str, Any], secondary: Dict[str, Any]) -> Dict[str, Any]:
+    """Combine two Tavily responses, preferring primary's answer and de-duplicating results by URL"""
+    if not secondary:
+        return primary
+    if not primary:
+        return secondary
+    merged = dict(primary)
+    merged["answer"] = primary.get("answer") or secondary.get("answer", "")
+    seen_urls = set()
+    results = []
+    for result in primary.get("results", []) + secondary.get("results", []):
+        url = result.get("url")
+        if url:
+            if url in seen_urls:
+                continue
+            seen_urls.add(url)
+        results.append(result)
+    merged["results"] = results
+    return merged
+
+
 class TavilyAgentService:
     def __init__(self):
+        self._session = _build_session()
+        self._aclient = httpx.AsyncClient(
+            timeout=30,
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=100),
+        )
+        # None until the background connection test finishes
+        self._healthy: Optional[bool] = None
         # Check if Tavily is enabled and API key is available
         if not settings.TAVILY_ENABLED or not settings.TAVILY_API_KEY:
             logger.error("Tavily service is not properly configured. API key missing or service disabled.")
@@ -21,10 +138,11 @@ class TavilyAgentService:
             # Set the Tavily API key as environment variable
             os.environ["TAVILY_API_KEY"] = settings.TAVILY_API_KEY
 
-            # Test the API with a simple request
-            self._test_api_connection()
-            
+            # Assume available and test the API in the background, so a slow
+            # Tavily doesn't hold up worker startup
             self.is_available = True
+            threading.Thread(target=self._test_api_connection, daemon=True).start()
+
             logger.info("Tavily agent service initialized successfully")
         except Exception as e:
             logger.error(f"Failed to initialize Tavily agent service: {str(e)}")
@@ -33,39 +151,78 @@ class TavilyAgentService:
     def _test_api_connection(self):
         """Test Tavily API connection with a simple query"""
         try:
-            test_response = self._search_tavily("test connection")
+            test_response = self._search_tavily("test connection", timeout=TAVILY_HEALTH_CHECK_TIMEOUT)
             if test_response and "results" in test_response:
                 logger.info("Tavily API connection test successful")
+                self._healthy = True
             else:
                 raise Exception("Invalid response from Tavily API")
         except Exception as e:
             logger.warning(f"Tavily API connection test failed: {str(e)}")
-            # Don't fail initialization for connection test failure
-            pass
+            self._healthy = False
 
-    def _search_tavily(self, query: str, max_results: int = 5) -> Dict[str, Any]:
+    def _search_payload(self, query: str, depth: str, max_results: int) -> Dict[str, Any]:
+        # Empty include/exclude domain filters are Tavily's defaults, so omit them
+        return {
+            "api_key": settings.TAVILY_API_KEY,
+            "query": query,
+            "search_depth": depth,
+            "include_answer": True,
+            "include_images": False,
+            "include_raw_content": False,
+            "max_results": max_results,
+        }
+
+    def _search_tavily(self, query: str, max_results: Optional[int] = None, timeout: float = 30,
+                       profile: Optional[str] = None) -> Dict[str, Any]:
         """Perform a web search using Tavily API"""
+        response = None
         try:
-            url = "https://api.tavily.com/search"
-            payload = {
-                "api_key": settings.TAVILY_API_KEY,
-                "query": query,
-                "search_depth": "basic",
-                "include_answer": True,
-                "include_images": False,
-                "include_raw_content": False,
-                "max_results": max_results,
-                "include_domains": [],
-                "exclude_domains": []
-            }
-            
-            response = requests.post(url, json=payload, timeout=30)
+            depth, max_results = _search_options(profile, max_results)
+            key, cached = _cached_search(query, depth, max_results)
+            if cached is not None:
+                return cached
+
+            payload = self._search_payload(query, depth, max_results)
+            response = self._session.post(TAVILY_SEARCH_URL, json=payload, timeout=timeout)
             response.raise_for_status()
             
-            return response.json()
+            result = _decode_search_response(response.content)
+            _store_search(key, result)
+            return result
         except requests.exceptions.RequestException as e:
             logger.error(f"Tavily API request failed: {str(e)}")
             return {}
+        except ValueError as e:
+            _log_invalid_response(e, response.content if response is not None else b"")
+            return {}
+        except Exception as e:
+            logger.error(f"Unexpected error in Tavily search: {str(e)}")
+            return {}
+
+    async def _asearch_tavily(self, query: str, max_results: Optional[int] = None,
+                              profile: Optional[str] = None) -> Dict[str, Any]:
+        """Perform a web search using Tavily API without blocking the event loop"""
+        response = None
+        try:
+            depth, max_results = _search_options(profile, max_results)
+            key, cached = _cached_search(query, depth, max_results)
+            if cached is not None:
+                return cached
+
+            payload = self._search_payload(query, depth, max_results)
+            response = await self._aclient.post(TAVILY_SEARCH_URL, json=payload)
+            response.raise_for_status()
+
+            result = _decode_search_response(response.content)
+            _store_search(key, result)
+            return result
+        except httpx.HTTPError as e:
+            logger.error(f"Tavily API request failed: {str(e)}")
+            return {}
+        except ValueError as e:
+            _log_invalid_response(e, response.content if response is not None else b"")
+            return {}
         except Exception as e:
             logger.error(f"Unexpected error in Tavily search: {str(e)}")
             return {}
@@ -76,7 +233,11 @@ class TavilyAgentService:
             if not search_response or "results" not in search_response:
                 return "I wasn't able to find relevant information from web sources for your query."
 
-            results = search_response.get("results", [])
+            # Drop low-relevance hits before any formatting work
+            results = [
+                result for result in search_response.get("results", [])
+                if result.get("score", 1.0) > TAVILY_MIN_RESULT_SCORE
+            ]
             answer = search_response.get("answer", "")
             
             if not results and not answer:
@@ -91,18 +252,17 @@ class TavilyAgentService:
             # Add key findings from search results
             if results:
                 response_parts.append("\n\n**Sources and Additional Details:**")
-                for i, result in enumerate(results[:3], 1):  # Limit to top 3 results
-                    title = result.get("title", "")
-                    content = result.get("content", "")
-                    url = result.get("url", "")
-                    
-                    if title and content:
+                response_parts.extend(
+                    _SOURCE_TEMPLATE.format(
+                        index=i,
+                        title=result["title"],
                         # Truncate content if too long
-                        truncated_content = content[:200] + "..." if len(content) > 200 else content
-                        source_text = f"\n{i}. **{title}**\n   {truncated_content}"
-                        if url:
-                            source_text += f"\n   Source: {url}"
-                        response_parts.append(source_text)
+                        content=result["content"] if len(result["content"]) <= 200 else f"{result['content'][:200]}...",
+                        source=f"\n   Source: {result['url']}" if result.get("url") else "",
+                    )
+                    for i, result in enumerate(results[:3], 1)  # Limit to top 3 results
+                    if result.get("title") and result.get("content")
+                )
             
             return "\n".join(response_parts)
             
@@ -136,22 +296,53 @@ class TavilyAgentService:
                 enhanced_query = f"{profile} {user_message}"
 
             # Perform web search
-            search_response = self._search_tavily(enhanced_query)
+            search_response = self._search_tavily(enhanced_query, profile=profile)
             
             # Format and return the response
-            formatted_response = self._format_search_results(search_response, user_message)
-            
-            # Add context note if file context was provided
-            if file_context:
-                formatted_response += "\n\n*Note: This response is based on current web information. If you have specific documents uploaded, please also consider that context.*"
-            
-            logger.info(f"Tavily agent successfully generated response for query")
-            return formatted_response
+            return self._finish_answer(search_response, user_message, file_context)
 
         except Exception as e:
             logger.error(f"Error in Tavily agent answer method: {str(e)}")
             return f"I encountered an error while searching for current information: {str(e)}. Please try again later."
 
+    async def aanswer(self, user_message: str, profile: str = None, file_context: str = None) -> str:
+        """
+        Async version of answer. When a profile enhances the query, the enhanced
+        and raw queries are searched concurrently and their results merged.
+        """
+        if not hasattr(self, 'is_available') or not self.is_available:
+            logger.error("Tavily agent service is not available. Cannot perform web search.")
+            return "I apologize, but I'm unable to perform web searches at the moment due to a configuration issue. Please try again later or contact support if the problem persists."
+
+        try:
+            logger.info(f"Tavily agent processing query: {user_message[:100]}...")
+
+            if profile and profile != "general":
+                enhanced_response, raw_response = await asyncio.gather(
+                    self._asearch_tavily(f"{profile} {user_message}", profile=profile),
+                    self._asearch_tavily(user_message, profile=profile),
+                )
+                search_response = _merge_search_responses(enhanced_response, raw_response)
+            else:
+                search_response = await self._asearch_tavily(user_message, profile=profile)
+
+            return self._finish_answer(search_response, user_message, file_context)
+
+        except Exception as e:
+            logger.error(f"Error in Tavily agent answer method: {str(e)}")
+            return f"I encountered an error while searching for current information: {str(e)}. Please try again later."
+
+    def _finish_answer(self, search_response: Dict[str, Any], user_message: str, file_context: Optional[str]) -> str:
+        """Format search results and add the uploaded-file note when relevant"""
+        formatted_response = self._format_search_results(search_response, user_message)
+
+        # Add context note if file context was provided
+        if file_context:
+            formatted_response += "\n\n*Note: This response is based on current web information. If you have specific documents uploaded, please also consider that context.*"
+
+        logger.info(f"Tavily agent successfully generated response for query")
+        return formatted_response
+
     def is_service_available(self) -> bool:
-        """Check if the Tavily service is available"""
-        return hasattr(self, 'is_available') and self.is_available
\ No newline at end of file
+        """Check if the Tavily service is available and has not failed its connection test"""
+        return hasattr(self, 'is_available') and self.is_available and self._healthy is not False
\ No newline at end of file
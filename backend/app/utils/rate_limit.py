@@ -0,0 +1,24 @@
+# app/utils/rate_limit.py
+from fastapi import Request
+from slowapi import Limiter
+from slowapi.util import get_remote_address
+
+from ..core.config import settings
+
+
+def rate_limit_key(request: Request) -> str:
+    """Limit authenticated callers per user and anonymous ones per client address"""
+    user_id = getattr(request.state, "user_id", None)
+    if user_id:
+        return f"user:{user_id}"
+    return get_remote_address(request)
+
+
+# Shared by the app and every router. With a redis:// storage URI the
+# moving-window counters live in Redis (updated atomically by Lua scripts in
+# the limits library), so the limit holds across all workers.
+limiter = Limiter(
+    key_func=rate_limit_key,
+    storage_uri=settings.RATE_LIMIT_STORAGE_URI,
+    strategy=settings.RATE_LIMIT_STRATEGY,
+)
@@ -1,57 +1,295 @@
 # app/utils/security.py
 import jwt
-import json
-from fastapi import Depends, HTTPException, status, Header
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
-from typing import Optional, Dict, Any
+from fastapi import BackgroundTasks, Depends, HTTPException, Request, status, Header
+from sqlalchemy import event, inspect as sa_inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
+from typing import Optional, Dict, Any, Tuple
 from datetime import datetime, timezone
+from dataclasses import dataclass
+import asyncio
+import base64
+import binascii
+import hashlib
+import hmac
 import logging
-import httpx
+import threading
+import time
 
-from ..db.database import get_db
+from ..db.database import get_db, SessionLocal
 from ..models.user import User
 from ..core.config import settings
 
-logger = logging.getLogger(__name__)
+# orjson parses token segments straight from bytes; its JSONDecodeError
+# subclasses ValueError like the stdlib one
+try:
+    from orjson import loads as _json_loads
+except ImportError:
+    from json import loads as _json_loads
 
-security = HTTPBearer()
+logger = logging.getLogger(__name__)
 
 # Supabase configuration
 SUPABASE_URL = settings.SUPABASE_URL
 SUPABASE_JWT_SECRET = settings.SUPABASE_JWT_SECRET
 
-async def verify_supabase_token(token: str) -> Dict[str, Any]:
+@dataclass(frozen=True)
+class AuthContext:
+    """Role and status flags of the authenticated user, evaluated once per request"""
+    user_id: str
+    is_admin: bool
+    is_expert: bool
+    is_active: bool
+    is_locked: bool
+
+    @classmethod
+    def from_user(cls, user: User) -> "AuthContext":
+        return cls(
+            user_id=user.id,
+            is_admin=user.is_admin(),
+            is_expert=user.is_expert(),
+            is_active=user.is_active(),
+            is_locked=user.is_locked(),
+        )
+
+def _auth_context(request: Request, user: User) -> AuthContext:
+    """Return the request's AuthContext, building it if authentication was overridden"""
+    auth = getattr(request.state, "auth", None)
+    if auth is None or auth.user_id != user.id:
+        auth = AuthContext.from_user(user)
+        request.state.auth = auth
+    return auth
+
+class _TTLCache:
+    """Small thread-safe per-process cache with a TTL and a size cap"""
+
+    def __init__(self, ttl: float, max_size: int):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries: Dict[Any, Tuple[Any, float]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, cached_at = entry
+            if time.monotonic() - cached_at > self.ttl:
+                del self._entries[key]
+                return None
+            return value
+
+    def set(self, key, value):
+        now = time.monotonic()
+        with self._lock:
+            if len(self._entries) >= self.max_size:
+                for stale in [k for k, (_, cached_at) in self._entries.items() if now - cached_at > self.ttl]:
+                    del self._entries[stale]
+                if len(self._entries) >= self.max_size:
+                    # Dicts keep insertion order, so the first key is the oldest entry
+                    del self._entries[next(iter(self._entries))]
+            self._entries[key] = (value, now)
+
+    def pop(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# Verified token payloads, keyed by the token's SHA-256 digest so the raw token
+# is never held. The TTL is short to bound how long a revoked token is accepted.
+TOKEN_CACHE_TTL = 5
+TOKEN_CACHE_MAX_SIZE = 10000
+_token_cache = _TTLCache(TOKEN_CACHE_TTL, TOKEN_CACHE_MAX_SIZE)
+
+# Column snapshots of authenticated users, keyed by external_id. ORM updates
+# in this process invalidate an entry; the TTL bounds staleness from writes
+# made by other workers or outside the ORM.
+USER_CACHE_TTL = 30
+USER_CACHE_MAX_SIZE = 5000
+_user_cache = _TTLCache(USER_CACHE_TTL, USER_CACHE_MAX_SIZE)
+_USER_COLUMNS = tuple(attr.key for attr in sa_inspect(User).column_attrs)
+# Bookkeeping columns written on every login; changes to them alone keep the entry
+_USER_CACHE_IGNORED_COLUMNS = frozenset({"last_login", "updated_at"})
+
+
+# last_login is written at most once per interval per user, after the response
+LAST_LOGIN_WRITE_INTERVAL = 300
+_last_login_writes = _TTLCache(LAST_LOGIN_WRITE_INTERVAL, 10000)
+
+
+def _token_cache_key(token: str) -> bytes:
+    return hashlib.sha256(token.encode("utf-8")).digest()
+
+
+def _get_user_cached(db: Session, external_id: str) -> Optional[User]:
+    """Find a user by external_id, serving repeat lookups from _user_cache"""
+    snapshot = _user_cache.get(external_id)
+    if snapshot is not None:
+        # Rebuild a detached instance and attach it without a SELECT, so the
+        # request can still modify and commit the user as usual
+        user = User(**snapshot)
+        make_transient_to_detached(user)
+        return db.merge(user, load=False)
+
+    user = db.query(User).filter(User.external_id == external_id).first()
+    if user is not None:
+        _user_cache.set(external_id, {key: getattr(user, key) for key in _USER_COLUMNS})
+    return user
+
+
+def _record_last_login(user_id: str):
+    """Bump last_login in its own session; runs as a background task"""
+    db = SessionLocal()
+    try:
+        # Bulk UPDATE: no SELECT, and no ORM event, so _user_cache stays warm
+        db.query(User).filter(User.id == user_id).update(
+            {User.last_login: datetime.now(timezone.utc)}, synchronize_session=False
+        )
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Failed to record last login for user {user_id}: {e}")
+    finally:
+        db.close()
+
+
+@event.listens_for(User, "after_update")
+def _invalidate_cached_user(mapper, connection, target):
+    state = sa_inspect(target)
+    if any(
+        state.attrs[key].history.has_changes()
+        for key in _USER_COLUMNS
+        if key not in _USER_CACHE_IGNORED_COLUMNS
+    ):
+        _user_cache.pop(target.external_id)
+        for old_external_id in state.attrs.external_id.history.deleted or ():
+            _user_cache.pop(old_external_id)
+
+
+@event.listens_for(User, "after_delete")
+def _evict_deleted_user(mapper, connection, target):
+    _user_cache.pop(target.external_id)
+
+
+def _b64url_decode(segment: str) -> bytes:
+    return base64.urlsafe_b64decode(segment + "=" * (-len(segment) % 4))
+
+
+# Claims every Supabase access token must carry
+_REQUIRED_CLAIMS = ("exp", "sub", "aud")
+_JWT_ALGORITHM = "HS256"
+_JWT_AUDIENCE = "authenticated"
+# Application role set by the custom access token hook; Supabase's own
+# "role" claim is the Postgres role ("authenticated")
+_ROLE_CLAIM = "user_role"
+
+
+def _hs256_key(secret: str) -> "hmac.HMAC":
+    """Keyed HMAC-SHA256 prepared once; copies of it skip re-deriving the key pads"""
+    return hmac.new(secret.encode("utf-8"), digestmod=hashlib.sha256)
+
+
+_SUPABASE_HS256_KEY = _hs256_key(SUPABASE_JWT_SECRET) if SUPABASE_JWT_SECRET else None
+
+
+def _decode_hs256(token: str, key: "hmac.HMAC", audience: str) -> Dict[str, Any]:
+    """
+    Verify an HS256 JWT and return its claims.
+
+    Same checks and exceptions as jwt.decode(token, secret, algorithms=["HS256"],
+    audience=audience, options={"require": ["exp", "sub", "aud"]}), but with
+    one split, one HMAC and one JSON parse.
+    """
+    try:
+        signing_input, _, signature_b64 = token.rpartition(".")
+        header_b64, _, payload_b64 = signing_input.partition(".")
+        if not header_b64 or not payload_b64 or "." in payload_b64:
+            raise jwt.DecodeError("Not enough segments")
+        header = _json_loads(_b64url_decode(header_b64))
+        signature = _b64url_decode(signature_b64)
+        payload = _json_loads(_b64url_decode(payload_b64))
+    except (binascii.Error, ValueError, UnicodeDecodeError) as e:
+        raise jwt.DecodeError(f"Invalid token encoding: {e}") from e
+    if not isinstance(header, dict) or not isinstance(payload, dict):
+        raise jwt.DecodeError("Invalid token segments")
+
+    if header.get("alg") != _JWT_ALGORITHM:
+        raise jwt.InvalidAlgorithmError("The specified alg value is not allowed")
+    mac = key.copy()
+    mac.update(signing_input.encode("ascii"))
+    if not hmac.compare_digest(mac.digest(), signature):
+        raise jwt.InvalidSignatureError("Signature verification failed")
+
+    for claim in _REQUIRED_CLAIMS:
+        if claim not in payload:
+            raise jwt.MissingRequiredClaimError(claim)
+
+    now = time.time()
+    exp = payload.get("exp")
+    if exp is not None:
+        if not isinstance(exp, (int, float)) or isinstance(exp, bool):
+            raise jwt.DecodeError("Expiration Time claim (exp) must be a number.")
+        if exp <= now:
+            raise jwt.ExpiredSignatureError("Signature has expired")
+    nbf = payload.get("nbf")
+    if nbf is not None:
+        if not isinstance(nbf, (int, float)) or isinstance(nbf, bool):
+            raise jwt.DecodeError("Not Before claim (nbf) must be a number.")
+        if nbf > now:
+            raise jwt.ImmatureSignatureError("The token is not yet valid (nbf)")
+    iat = payload.get("iat")
+    if iat is not None:
+        if not isinstance(iat, (int, float)) or isinstance(iat, bool):
+            raise jwt.InvalidIssuedAtError("Issued At claim (iat) must be an integer.")
+        if iat > now:
+            raise jwt.ImmatureSignatureError("The token is not yet valid (iat)")
+
+    aud = payload["aud"]
+    audiences = [aud] if isinstance(aud, str) else aud
+    if not isinstance(audiences, list) or audience not in audiences:
+        raise jwt.InvalidAudienceError("Audience doesn't match")
+    return payload
+
+
+def _is_expired(payload: Dict[str, Any]) -> bool:
+    # Plain epoch comparison; the claim's type was validated when decoding
+    exp = payload.get('exp')
+    return bool(exp) and exp < time.time()
+
+def verify_supabase_token(token: str) -> Dict[str, Any]:
     """Verify Supabase JWT token and return user data"""
     try:
-        logger.info(f"Verifying token, SUPABASE_JWT_SECRET configured: {'Yes' if SUPABASE_JWT_SECRET else 'No'}")
-        
-        if not SUPABASE_JWT_SECRET:
+        if _SUPABASE_HS256_KEY is None:
             logger.error("SUPABASE_JWT_SECRET not configured")
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="Authentication not properly configured"
             )
+
+        cache_key = _token_cache_key(token)
+        payload = _token_cache.get(cache_key)
+        if payload is not None:
+            # The signature was already verified; only expiry can have changed
+            if _is_expired(payload):
+                _token_cache.pop(cache_key)
+                logger.warning("Token has expired")
+                raise HTTPException(
+                    status_code=status.HTTP_401_UNAUTHORIZED,
+                    detail="Token has expired"
+                )
+            return payload
         
-        # Decode the JWT token using Supabase secret
-        payload = jwt.decode(
-            token, 
-            SUPABASE_JWT_SECRET, 
-            algorithms=["HS256"],
-            audience="authenticated"
-        )
-        
-        logger.info(f"Token verified successfully for user: {payload.get('sub')}")
+        # Decode the JWT token using Supabase secret; this also verifies exp
+        # and raises ExpiredSignatureError
+        payload = _decode_hs256(token, _SUPABASE_HS256_KEY, audience=_JWT_AUDIENCE)
         
-        # Check if token is expired
-        exp = payload.get('exp')
-        if exp and datetime.fromtimestamp(exp, tz=timezone.utc) < datetime.now(timezone.utc):
-            logger.warning("Token has expired")
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Token has expired"
-            )
+        logger.debug("Token verified successfully for user: %s", payload.get('sub'))
         
+        _token_cache.set(cache_key, payload)
         return payload
     except jwt.ExpiredSignatureError:
         logger.warning("Token expired signature error")
@@ -66,37 +304,10 @@ async def verify_supabase_token(token: str) -> Dict[str, Any]:
             detail="Invalid authentication token"
         )
 
-async def get_current_user_from_token(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> User:
-    """Get current user from Supabase JWT token"""
-    
-    logger.info("Attempting to authenticate user from token")
-    
-    if not credentials:
-        logger.warning("No credentials provided")
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Authentication token required"
-        )
-    
-    # Verify the Supabase token
-    token_data = await verify_supabase_token(credentials.credentials)
-    
-    # Get user ID from token (Supabase user ID)
-    user_id = token_data.get('sub')
-    if not user_id:
-        logger.error("Token missing user ID (sub)")
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid token: missing user ID"
-        )
-    
-    logger.info(f"Looking for user with external_id: {user_id}")
-    
+def _load_authenticated_user(db: Session, user_id: str) -> User:
+    """Look up and validate the token's user; blocking, so run it off the event loop"""
     # Find user in local database by external_id (Supabase user ID)
-    user = db.query(User).filter(User.external_id == user_id).first()
+    user = _get_user_cached(db, user_id)
     
     if not user:
         logger.error(f"User with external_id {user_id} not found in local database")
@@ -105,7 +316,7 @@ async def get_current_user_from_token(
             detail="User not found in local database"
         )
     
-    logger.info(f"Found user: {user.email}, role: {user.role}")
+    logger.debug("Found user: %s, role: %s", user.email, user.role)
     
     # Check if user account is active
     if not user.is_active():
@@ -123,18 +334,115 @@ async def get_current_user_from_token(
             detail="User account is locked due to too many failed login attempts"
         )
     
-    # Update last login
-    user.update_last_login()
-    db.commit()
+    return user
+
+def _service_user(payload: Dict[str, Any]) -> Optional[User]:
+    """
+    Build an admin User for internal service tokens without touching the database.
+
+    app_metadata can only be written with the Supabase service key, and the
+    token signature has already been verified, so the role claim is trusted.
+    """
+    if not settings.SUPABASE_SERVICE_TOKENS_ENABLED:
+        return None
+    app_metadata = payload.get("app_metadata")
+    if not isinstance(app_metadata, dict) or app_metadata.get("role") != "service":
+        return None
+    return User(
+        id=payload["sub"],
+        external_id=payload["sub"],
+        email=payload.get("email"),
+        role="admin",
+        status="active",
+        subscription_level="Free",
+        usage_count=0,
+        monthly_limit=0,
+        failed_login_attempts=0,
+    )
+
+async def get_token_payload(
+    authorization: Optional[str] = Header(None)
+) -> Dict[str, Any]:
+    """Get the verified Supabase JWT claims from the Authorization header"""
+    
+    # Parse the bearer header directly; keeps HTTPBearer's 403 response
+    if not authorization or authorization[:7].lower() != "bearer ":
+        logger.warning("No credentials provided")
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authenticated"
+        )
+    token = authorization[7:].strip()
+    if not token:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authenticated"
+        )
+    
+    # Verify the Supabase token; pure CPU, so it runs inline on the event loop
+    return verify_supabase_token(token)
+
+async def get_current_user_from_token(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    token_data: Dict[str, Any] = Depends(get_token_payload),
+    db: Session = Depends(get_db)
+) -> User:
+    """Get current user from Supabase JWT token"""
     
-    logger.info(f"Successfully authenticated user: {user.email}")
+    # Get user ID from token (Supabase user ID)
+    user_id = token_data.get('sub')
+    if not user_id:
+        logger.error("Token missing user ID (sub)")
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid token: missing user ID"
+        )
+    
+    service_user = _service_user(token_data)
+    if service_user is not None:
+        request.state.user_id = service_user.id
+        request.state.auth = AuthContext.from_user(service_user)
+        return service_user
+    
+    # The lookup uses the sync session, so run it in a worker thread instead
+    # of blocking the event loop for the round trip
+    user = await asyncio.to_thread(_load_authenticated_user, db, user_id)
+    # Lets the rate limiter key authenticated requests by user
+    request.state.user_id = user.id
+    request.state.auth = AuthContext.from_user(user)
+
+    # Update last login, throttled and after the response is sent
+    if _last_login_writes.get(user.id) is None:
+        _last_login_writes.set(user.id, True)
+        background_tasks.add_task(_record_last_login, user.id)
+    
+    logger.debug("Successfully authenticated user: %s", user.email)
     return user
 
+async def get_admin_token_payload(
+    token_data: Dict[str, Any] = Depends(get_token_payload)
+) -> Dict[str, Any]:
+    """
+    Verify admin privileges from the token's role claim, without loading the user.
+
+    The claim is added by the Supabase custom access token hook, so a role
+    change takes effect when the user's token is next refreshed. Endpoints
+    that need the User row should keep using get_current_admin_user.
+    """
+    if token_data.get(_ROLE_CLAIM) != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin privileges required"
+        )
+    return token_data
+
 async def get_current_admin_user(
+    request: Request,
     current_user: User = Depends(get_current_user_from_token)
 ) -> User:
     """Get current user and verify admin privileges"""
-    if not current_user.is_admin():
+    if not _auth_context(request, current_user).is_admin:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Admin privileges required"
@@ -142,10 +450,12 @@ async def get_current_admin_user(
     return current_user
 
 async def get_current_expert_user(
+    request: Request,
     current_user: User = Depends(get_current_user_from_token)
 ) -> User:
     """Get current user and verify expert privileges"""
-    if not current_user.is_expert() and not current_user.is_admin():
+    auth = _auth_context(request, current_user)
+    if not (auth.is_admin or auth.is_expert):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Expert privileges required"
@@ -153,30 +463,43 @@ async def get_current_expert_user(
     return current_user
 
 def require_subscription(
+    request: Request,
     current_user: User = Depends(get_current_user_from_token)
 ) -> User:
     """Require user to have active subscription or be admin"""
-    if current_user.is_admin():
+    auth = _auth_context(request, current_user)
+    if auth.is_admin:
         return current_user
     
-    if not current_user.can_make_request():
-        if current_user.subscription_level == "Free" and current_user.usage_count >= current_user.monthly_limit:
-            raise HTTPException(
-                status_code=status.HTTP_402_PAYMENT_REQUIRED,
-                detail="Monthly request limit exceeded. Please upgrade your subscription."
-            )
-        elif not current_user.has_active_subscription():
-            raise HTTPException(
-                status_code=status.HTTP_402_PAYMENT_REQUIRED,
-                detail="Active subscription required"
-            )
+    # Same rules as User.can_make_request, evaluated once from the loaded row
+    is_free = current_user.subscription_level == "Free"
+    usage_count = current_user.usage_count
+    monthly_limit = current_user.monthly_limit
+    subscribed = current_user.has_active_subscription()
+    
+    if auth.is_active:
+        if is_free:
+            allowed = usage_count < monthly_limit
         else:
-            raise HTTPException(
-                status_code=status.HTTP_402_PAYMENT_REQUIRED,
-                detail="Request limit exceeded"
-            )
+            allowed = subscribed and (monthly_limit <= 0 or usage_count < monthly_limit)
+        if allowed:
+            return current_user
     
-    return current_user
+    if is_free and usage_count >= monthly_limit:
+        raise HTTPException(
+            status_code=status.HTTP_402_PAYMENT_REQUIRED,
+            detail="Monthly request limit exceeded. Please upgrade your subscription."
+        )
+    elif not subscribed:
+        raise HTTPException(
+            status_code=status.HTTP_402_PAYMENT_REQUIRED,
+            detail="Active subscription required"
+        )
+    else:
+        raise HTTPException(
+            status_code=status.HTTP_402_PAYMENT_REQUIRED,
+            detail="Request limit exceeded"
+        )
 
 # Legacy function for compatibility
 verify_token = verify_supabase_token
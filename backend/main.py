@@ -1,11 +1,10 @@
 # app/main.py
-from fastapi import FastAPI, Request
+from fastapi import APIRouter, FastAPI, Request
 from dotenv import load_dotenv
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 
-from slowapi import Limiter, _rate_limit_exceeded_handler
-from slowapi.util import get_remote_address
+from slowapi import _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
 
 from app.db.database import init_db
@@ -18,6 +17,7 @@ from app.routers.stripe import router as payments_router
 from app.routers.support import router as support_router
 from app.routers.reports import router as reports_router
 from app.core.config import settings
+from app.utils.rate_limit import limiter
 
 # Load environment variables from .env file
 load_dotenv()
@@ -25,9 +25,6 @@ load_dotenv()
 # Import the centralized logger - this will handle all logging setup
 from app.core.logger import logger
 
-# Initialize rate limiter
-limiter = Limiter(key_func=get_remote_address)
-
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
@@ -54,19 +51,23 @@ app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.CORS_ORIGINS,
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    # Explicit lists let Starlette send a fixed preflight response instead of
+    # mirroring each request's Access-Control-Request-Headers
+    allow_methods=["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"],
+    allow_headers=["Authorization", "Content-Type", "Accept", "X-Requested-With"],
 )
 
-# Include routers
-app.include_router(auth_router, prefix="/api/auth")
-app.include_router(users_router, prefix="/api/users")
-app.include_router(files_router, prefix="/api/files")
-app.include_router(chats_router, prefix="/api/chats")
-app.include_router(admin_router, prefix="/api/admin")
-app.include_router(payments_router, prefix="/api/payments")
-app.include_router(support_router, prefix="/api/support")
-app.include_router(reports_router, prefix="/api/reports")
+# Include routers under a single /api parent
+api_router = APIRouter(prefix="/api")
+api_router.include_router(auth_router, prefix="/auth")
+api_router.include_router(users_router, prefix="/users")
+api_router.include_router(files_router, prefix="/files")
+api_router.include_router(chats_router, prefix="/chats")
+api_router.include_router(admin_router, prefix="/admin")
+api_router.include_router(payments_router, prefix="/payments")
+api_router.include_router(support_router, prefix="/support")
+api_router.include_router(reports_router, prefix="/reports")
+app.include_router(api_router)
 
 @app.get("/")
 async def root():
@@ -84,7 +85,23 @@ async def health():
     }
 
 if __name__ == "__main__":
+    import os
+    import sys
     import uvicorn
     reload = settings.NODE_ENV == "development"
+    # uvicorn can't combine the reloader with multiple workers. Every worker
+    # keeps its own Docling and PDF pools and, with the default memory://
+    # RATE_LIMIT_STORAGE_URI, its own rate-limit counters: point that at
+    # Redis before raising WEB_CONCURRENCY above 1.
+    workers = 1 if reload else int(os.environ.get("WEB_CONCURRENCY", 1))
     print("Starting server...")
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=reload)
\ No newline at end of file
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=8000,
+        reload=reload,
+        workers=workers,
+        # Both ship with uvicorn[standard]; uvloop has no Windows build
+        loop="asyncio" if sys.platform == "win32" else "uvloop",
+        http="httptools",
+    )
\ No newline at end of file
@@ -0,0 +1,54 @@
+import os
+import time
+import uuid
+
+import jwt
+import pytest
+from fastapi.testclient import TestClient
+
+
+def _claim_headers(sub: str, **claims) -> dict:
+    """Bearer headers for a Supabase-style token with the given extra claims"""
+    now = int(time.time())
+    payload = {"sub": sub, "aud": "authenticated", "role": "authenticated", "iat": now, "exp": now + 3600}
+    payload.update(claims)
+    token = jwt.encode(payload, os.environ["SUPABASE_JWT_SECRET"], algorithm="HS256")
+    return {"Authorization": f"Bearer {token}"}
+
+
+class TestAdminTokenGate:
+    """Admin read endpoints are gated on the user_role claim alone"""
+
+    @pytest.mark.api
+    def test_admin_claim_allowed(self, client: TestClient, admin_auth_headers):
+        """Test an admin's token is let through"""
+        response = client.get("/api/admin/support-messages", headers=admin_auth_headers)
+
+        assert response.status_code == 200
+        assert response.json()["messages"] == []
+
+    @pytest.mark.api
+    def test_non_admin_claim_forbidden(self, client: TestClient, auth_headers):
+        """Test a regular user's token is rejected"""
+        response = client.get("/api/admin/support-messages", headers=auth_headers)
+
+        assert response.status_code == 403
+        assert response.json()["detail"] == "Admin privileges required"
+
+    @pytest.mark.api
+    def test_admin_claim_without_user_row(self, client: TestClient, db_session):
+        """Test the claim is enough: no local User row is loaded for the check"""
+        headers = _claim_headers(str(uuid.uuid4()), user_role="admin")
+
+        response = client.get("/api/admin/support-messages", headers=headers)
+
+        assert response.status_code == 200
+
+    @pytest.mark.api
+    def test_admin_row_without_claim_forbidden(self, client: TestClient, admin_user):
+        """Test an admin row does not help a token that lacks the claim"""
+        headers = _claim_headers(admin_user.external_id)
+
+        response = client.get("/api/admin/support-messages", headers=headers)
+
+        assert response.status_code == 403
@@ -1,6 +1,6 @@
 import pytest
 from fastapi.testclient import TestClient
-from backend.tests.factories import UserFactory, ChatFactory, ChatMessageFactory
+from backend.tests.factories import ChatFactory, ChatMessageFactory
 
 
 class TestChatAPI:
@@ -76,9 +76,7 @@ class TestChatAPI:
     def test_get_user_chats_pagination(self, client: TestClient, auth_headers, test_user, db_session):
         """Test chat pagination"""
         # Create multiple chats
-        for i in range(25):
-            chat = ChatFactory(user_id=test_user.id, name=f"Chat {i}")
-            db_session.add(chat)
+        db_session.add_all([ChatFactory(user_id=test_user.id, name=f"Chat {i}") for i in range(25)])
         db_session.commit()
 
         # Test first page
@@ -108,17 +106,9 @@ class TestChatAPI:
         assert data["name"] == chat.name
 
     @pytest.mark.api
-    def test_get_chat_unauthorized(self, client: TestClient, auth_headers, db_session):
+    def test_get_chat_unauthorized(self, client: TestClient, auth_headers, other_user_chat):
         """Test retrieving chat from another user"""
-        other_user = UserFactory()
-        db_session.add(other_user)
-        db_session.commit()
-
-        chat = ChatFactory(user_id=other_user.id)
-        db_session.add(chat)
-        db_session.commit()
-
-        response = client.get(f"/api/chats/{chat.id}", headers=auth_headers)
+        response = client.get(f"/api/chats/{other_user_chat.id}", headers=auth_headers)
         assert response.status_code == 404
 
     @pytest.mark.api
@@ -143,17 +133,9 @@ class TestChatAPI:
         assert response.status_code == 404
 
     @pytest.mark.api
-    def test_delete_chat_unauthorized(self, client: TestClient, auth_headers, db_session):
+    def test_delete_chat_unauthorized(self, client: TestClient, auth_headers, other_user_chat):
         """Test deleting chat from another user"""
-        other_user = UserFactory()
-        db_session.add(other_user)
-        db_session.commit()
-
-        chat = ChatFactory(user_id=other_user.id)
-        db_session.add(chat)
-        db_session.commit()
-
-        response = client.delete(f"/api/chats/{chat.id}", headers=auth_headers)
+        response = client.delete(f"/api/chats/{other_user_chat.id}", headers=auth_headers)
         assert response.status_code == 404
 
 
@@ -208,17 +190,9 @@ class TestChatMessageAPI:
         assert data[1]["role"] in ["user", "assistant"]
 
     @pytest.mark.api
-    def test_get_messages_unauthorized_chat(self, client: TestClient, auth_headers, db_session):
+    def test_get_messages_unauthorized_chat(self, client: TestClient, auth_headers, other_user_chat):
         """Test retrieving messages from unauthorized chat"""
-        other_user = UserFactory()
-        db_session.add(other_user)
-        db_session.commit()
-
-        chat = ChatFactory(user_id=other_user.id)
-        db_session.add(chat)
-        db_session.commit()
-
-        response = client.get(f"/api/chats/{chat.id}/messages", headers=auth_headers)
+        response = client.get(f"/api/chats/{other_user_chat.id}/messages", headers=auth_headers)
         assert response.status_code == 404
 
     @pytest.mark.api
@@ -1,19 +1,32 @@
 import pytest
-from unittest.mock import Mock, patch, mock_open
+from unittest.mock import AsyncMock, Mock, patch, mock_open
 from fastapi.testclient import TestClient
 from fastapi import UploadFile
 import json
 import io
-from backend.app.main import app
+
+
+def _processed(content, fmt="csv"):
+    """A successful basic-processing result, shaped like FileProcessor.process_file's"""
+    return {
+        "success": True,
+        "content": content,
+        "metadata": {"file_name": f"test.{fmt}", "format": fmt, "processing_method": "basic"},
+        "processing_time": 0.01,
+        "enhanced_processing": False
+    }
 
 
 class TestFilesRouter:
     """Test suite for files router endpoints"""
 
     @pytest.fixture
-    def client(self):
-        """Create test client"""
-        return TestClient(app)
+    def mock_file_processor(self):
+        """Patched FileProcessor instance whose process_file reports empty content"""
+        with patch('app.routers.files.FileProcessor') as mock_processor:
+            instance = mock_processor.return_value
+            instance.process_file = AsyncMock(return_value=_processed([]))
+            yield instance
 
     @pytest.fixture
     def sample_csv_content(self):
@@ -30,62 +43,47 @@ class TestFilesRouter:
             ]
         }).encode()
 
-    def test_upload_csv_file_success(self, client, auth_headers, sample_csv_content):
+    def test_upload_csv_file_success(self, client, mock_file_processor, auth_headers, sample_csv_content):
         """Test successful CSV file upload"""
-        with patch('backend.app.routers.files.FileAnalyzer') as mock_analyzer:
-            # Mock analyzer response
-            mock_analyzer_instance = Mock()
-            mock_analyzer.return_value = mock_analyzer_instance
-            mock_analyzer_instance.analyze_file.return_value = {
-                "status": "success",
-                "preview": {"data": [{"name": "John", "age": "25"}]},
-                "statistical": {"rows": 2, "columns": 3},
-                "insights": ["2 records found"]
-            }
+        mock_file_processor.process_file.return_value = _processed([
+            {"name": "John", "age": 25, "salary": 50000},
+            {"name": "Jane", "age": 30, "salary": 60000}
+        ])
 
-            files = {"file": ("test.csv", sample_csv_content, "text/csv")}
-            response = client.post(
-                "/api/files/upload",
-                files=files,
-                headers=auth_headers
-            )
+        files = {"file": ("test.csv", sample_csv_content, "text/csv")}
+        response = client.post(
+            "/api/files/upload",
+            files=files,
+            headers=auth_headers
+        )
 
-            assert response.status_code == 200
-            data = response.json()
-            assert data["success"] is True
-            assert data["filename"] == "test.csv"
-            assert "chat_id" in data
+        assert response.status_code == 200
+        data = response.json()
+        assert data["success"] is True
+        assert data["filename"] == "test.csv"
+        assert "chat_id" in data
 
-    def test_upload_json_file_success(self, client, auth_headers, sample_json_content):
+    def test_upload_json_file_success(self, client, mock_file_processor, auth_headers, sample_json_content):
         """Test successful JSON file upload"""
-        with patch('backend.app.routers.files.FileAnalyzer') as mock_analyzer:
-            # Mock analyzer response
-            mock_analyzer_instance = Mock()
-            mock_analyzer.return_value = mock_analyzer_instance
-            mock_analyzer_instance.analyze_file.return_value = {
-                "status": "success",
-                "preview": {"users": [{"id": 1, "name": "John"}]},
-                "statistical": {"type": "object", "keys": 1},
-                "insights": ["JSON object with users array"]
-            }
-
-            files = {"file": ("test.json", sample_json_content, "application/json")}
-            response = client.post(
-                "/api/files/upload",
-                files=files,
-                headers=auth_headers
-            )
+        mock_file_processor.process_file.return_value = _processed(json.loads(sample_json_content), "json")
 
-            assert response.status_code == 200
-            data = response.json()
-            assert data["success"] is True
-            assert data["filename"] == "test.json"
+        files = {"file": ("test.json", sample_json_content, "application/json")}
+        response = client.post(
+            "/api/files/upload",
+            files=files,
+            headers=auth_headers
+        )
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["success"] is True
+        assert data["filename"] == "test.json"
 
-    def test_upload_file_too_large(self, client, auth_headers):
+    def test_upload_file_too_large(self, client, auth_headers, monkeypatch):
         """Test file upload with file too large"""
-        # Create large file content (> 10MB)
-        large_content = b"x" * (11 * 1024 * 1024)
-        files = {"file": ("large.csv", large_content, "text/csv")}
+        # Shrink the limit so the oversized body is 2 KB instead of > 50 MB
+        monkeypatch.setattr("app.routers.files.MAX_UPLOAD_SIZE", 1024)
+        files = {"file": ("large.csv", io.BytesIO(b"x" * 2048), "text/csv")}
 
         response = client.post(
             "/api/files/upload",
@@ -117,21 +115,9 @@ class TestFilesRouter:
 
         assert response.status_code == 401
 
-    def test_upload_file_with_existing_chat(self, client, auth_headers, sample_csv_content):
+    def test_upload_file_with_existing_chat(self, client, mock_file_processor, auth_headers, sample_csv_content):
         """Test file upload with existing chat ID"""
-        with patch('backend.app.routers.files.FileAnalyzer') as mock_analyzer, \
-             patch('backend.app.routers.files.ChatRepository') as mock_chat_repo:
-
-            # Mock analyzer
-            mock_analyzer_instance = Mock()
-            mock_analyzer.return_value = mock_analyzer_instance
-            mock_analyzer_instance.analyze_file.return_value = {
-                "status": "success",
-                "preview": {},
-                "statistical": {},
-                "insights": []
-            }
-
+        with patch('app.routers.files.ChatRepository') as mock_chat_repo:
             # Mock chat repository
             mock_repo_instance = Mock()
             mock_chat_repo.return_value = mock_repo_instance
@@ -141,8 +127,9 @@ class TestFilesRouter:
 
             files = {"file": ("test.csv", sample_csv_content, "text/csv")}
             response = client.post(
-                "/api/files/upload?chat_id=existing-chat-id",
+                "/api/files/upload",
                 files=files,
+                data={"chat_id": "existing-chat-id"},
                 headers=auth_headers
             )
 
@@ -150,30 +137,27 @@ class TestFilesRouter:
             data = response.json()
             assert data["chat_id"] == "existing-chat-id"
 
-    def test_upload_file_analysis_error(self, client, auth_headers, sample_csv_content):
+    def test_upload_file_analysis_error(self, client, mock_file_processor, auth_headers, sample_csv_content):
         """Test file upload with analysis error"""
-        with patch('backend.app.routers.files.FileAnalyzer') as mock_analyzer:
-            # Mock analyzer to return error
-            mock_analyzer_instance = Mock()
-            mock_analyzer.return_value = mock_analyzer_instance
-            mock_analyzer_instance.analyze_file.return_value = {
-                "status": "error",
-                "error": "Analysis failed"
-            }
+        mock_file_processor.process_file.return_value = {
+            "success": False,
+            "error_message": "Analysis failed"
+        }
 
-            files = {"file": ("test.csv", sample_csv_content, "text/csv")}
-            response = client.post(
-                "/api/files/upload",
-                files=files,
-                headers=auth_headers
-            )
+        files = {"file": ("test.csv", sample_csv_content, "text/csv")}
+        response = client.post(
+            "/api/files/upload",
+            files=files,
+            headers=auth_headers
+        )
 
-            assert response.status_code == 422
-            assert "Analysis failed" in response.json()["detail"]
+        # The router surfaces an unsuccessful process_file result as a 500
+        assert response.status_code == 500
+        assert "Analysis failed" in response.json()["detail"]
 
     def test_upload_file_processing_exception(self, client, auth_headers, sample_csv_content):
         """Test file upload with processing exception"""
-        with patch('backend.app.routers.files.FileAnalyzer', side_effect=Exception("Processing error")):
+        with patch('app.routers.files.FileProcessor', side_effect=Exception("Processing error")):
             files = {"file": ("test.csv", sample_csv_content, "text/csv")}
             response = client.post(
                 "/api/files/upload",
@@ -197,43 +181,21 @@ class TestFilesRouter:
         # Should handle empty file gracefully
         assert response.status_code in [400, 422, 500]
 
-    def test_upload_file_invalid_chat_id(self, client, auth_headers, sample_csv_content):
+    def test_upload_file_invalid_chat_id(self, client, mock_file_processor, auth_headers, sample_csv_content):
         """Test file upload with invalid chat ID format"""
-        with patch('backend.app.routers.files.FileAnalyzer') as mock_analyzer:
-            mock_analyzer_instance = Mock()
-            mock_analyzer.return_value = mock_analyzer_instance
-            mock_analyzer_instance.analyze_file.return_value = {
-                "status": "success",
-                "preview": {},
-                "statistical": {},
-                "insights": []
-            }
-
-            files = {"file": ("test.csv", sample_csv_content, "text/csv")}
-            response = client.post(
-                "/api/files/upload?chat_id=invalid-uuid",
-                files=files,
-                headers=auth_headers
-            )
+        files = {"file": ("test.csv", sample_csv_content, "text/csv")}
+        response = client.post(
+            "/api/files/upload?chat_id=invalid-uuid",
+            files=files,
+            headers=auth_headers
+        )
 
-            # Should still succeed by creating new chat
-            assert response.status_code == 200
+        # Should still succeed by creating new chat
+        assert response.status_code == 200
 
-    def test_upload_file_chat_not_owned(self, client, auth_headers, sample_csv_content):
+    def test_upload_file_chat_not_owned(self, client, mock_file_processor, auth_headers, sample_csv_content):
         """Test file upload with chat not owned by user"""
-        with patch('backend.app.routers.files.FileAnalyzer') as mock_analyzer, \
-             patch('backend.app.routers.files.ChatRepository') as mock_chat_repo:
-
-            # Mock analyzer
-            mock_analyzer_instance = Mock()
-            mock_analyzer.return_value = mock_analyzer_instance
-            mock_analyzer_instance.analyze_file.return_value = {
-                "status": "success",
-                "preview": {},
-                "statistical": {},
-                "insights": []
-            }
-
+        with patch('app.routers.files.ChatRepository') as mock_chat_repo:
             # Mock chat repository to return None (chat not found/not owned)
             mock_repo_instance = Mock()
             mock_chat_repo.return_value = mock_repo_instance
@@ -241,8 +203,9 @@ class TestFilesRouter:
 
             files = {"file": ("test.csv", sample_csv_content, "text/csv")}
             response = client.post(
-                "/api/files/upload?chat_id=not-owned-chat-id",
+                "/api/files/upload",
                 files=files,
+                data={"chat_id": "not-owned-chat-id"},
                 headers=auth_headers
             )
 
@@ -255,52 +218,33 @@ class TestFilesRouter:
         ("CSV", "text/csv"),  # Test case insensitive
         ("JSON", "application/json")
     ])
-    def test_upload_file_supported_types(self, client, auth_headers, file_extension, content_type):
+    def test_upload_file_supported_types(self, client, mock_file_processor, auth_headers, file_extension, content_type):
         """Test upload of different supported file types"""
-        with patch('backend.app.routers.files.FileAnalyzer') as mock_analyzer:
-            mock_analyzer_instance = Mock()
-            mock_analyzer.return_value = mock_analyzer_instance
-            mock_analyzer_instance.analyze_file.return_value = {
-                "status": "success",
-                "preview": {},
-                "statistical": {},
-                "insights": []
-            }
-
-            content = b"test content"
-            files = {"file": (f"test.{file_extension}", content, content_type)}
-            response = client.post(
-                "/api/files/upload",
-                files=files,
-                headers=auth_headers
-            )
+        content = b"test content"
+        files = {"file": (f"test.{file_extension}", content, content_type)}
+        response = client.post(
+            "/api/files/upload",
+            files=files,
+            headers=auth_headers
+        )
 
-            assert response.status_code == 200
+        assert response.status_code == 200
 
     def test_upload_file_content_extraction_csv(self, client, auth_headers):
         """Test CSV content extraction during upload"""
         csv_content = b"name,value\ntest,123\ntest2,456"
 
-        with patch('backend.app.routers.files.FileAnalyzer') as mock_analyzer, \
-             patch('pandas.read_csv') as mock_read_csv:
-
+        # The real FileProcessor runs; only the pandas parse is stubbed
+        with patch('pandas.read_csv') as mock_read_csv:
             # Mock pandas to return specific DataFrame
             mock_df = Mock()
+            mock_df.columns = ["name", "value"]
             mock_df.to_dict.return_value = [
                 {"name": "test", "value": 123},
                 {"name": "test2", "value": 456}
             ]
             mock_read_csv.return_value = mock_df
 
-            mock_analyzer_instance = Mock()
-            mock_analyzer.return_value = mock_analyzer_instance
-            mock_analyzer_instance.analyze_file.return_value = {
-                "status": "success",
-                "preview": {},
-                "statistical": {},
-                "insights": []
-            }
-
             files = {"file": ("test.csv", csv_content, "text/csv")}
             response = client.post(
                 "/api/files/upload",
@@ -312,28 +256,19 @@ class TestFilesRouter:
             # Verify pandas was called
             mock_read_csv.assert_called_once()
 
-    def test_upload_file_content_extraction_json(self, client, auth_headers):
+    def test_upload_file_content_extraction_json(self, client, mock_file_processor, auth_headers):
         """Test JSON content extraction during upload"""
         json_data = {"test": "data", "numbers": [1, 2, 3]}
         json_content = json.dumps(json_data).encode()
+        mock_file_processor.process_file.return_value = _processed(json_data, "json")
 
-        with patch('backend.app.routers.files.FileAnalyzer') as mock_analyzer:
-            mock_analyzer_instance = Mock()
-            mock_analyzer.return_value = mock_analyzer_instance
-            mock_analyzer_instance.analyze_file.return_value = {
-                "status": "success",
-                "preview": {},
-                "statistical": {},
-                "insights": []
-            }
-
-            files = {"file": ("test.json", json_content, "application/json")}
-            response = client.post(
-                "/api/files/upload",
-                files=files,
-                headers=auth_headers
-            )
+        files = {"file": ("test.json", json_content, "application/json")}
+        response = client.post(
+            "/api/files/upload",
+            files=files,
+            headers=auth_headers
+        )
 
-            assert response.status_code == 200
-            data = response.json()
-            assert data["content"] == json_data
\ No newline at end of file
+        assert response.status_code == 200
+        data = response.json()
+        assert data["content"] == json_data
\ No newline at end of file
@@ -0,0 +1,203 @@
+# tests/conftest.py
+import os
+import time
+import uuid
+from unittest.mock import patch
+
+# Settings are read at import time, so point the app at the test database and
+# a known JWT secret before anything under app/ is imported
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL", "sqlite://")
+# Under pytest-xdist each worker is its own process, so an in-memory database
+# is already private to it; a SQLite file gets one copy per worker
+_XDIST_WORKER = os.environ.get("PYTEST_XDIST_WORKER")
+if _XDIST_WORKER and TEST_DATABASE_URL.startswith("sqlite:///") and ":memory:" not in TEST_DATABASE_URL:
+    _root, _ext = os.path.splitext(TEST_DATABASE_URL)
+    TEST_DATABASE_URL = f"{_root}-{_XDIST_WORKER}{_ext}"
+TEST_JWT_SECRET = "test-supabase-jwt-secret"
+os.environ.setdefault("DATABASE_URL", TEST_DATABASE_URL)
+os.environ["SUPABASE_JWT_SECRET"] = TEST_JWT_SECRET
+
+import jwt
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.db.database import Base, get_db
+from app.models.user import User
+from app.models import reports, support  # noqa: F401 - register tables
+from app.models.chat import Chat
+from app.utils import security
+import main
+from main import app
+
+
+@pytest.fixture(scope="session")
+def engine():
+    """Test engine with the schema created once per session"""
+    if TEST_DATABASE_URL.startswith("sqlite"):
+        engine = create_engine(
+            TEST_DATABASE_URL,
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool,
+        )
+
+        # pysqlite's own transaction handling breaks SAVEPOINT; let SQLAlchemy
+        # emit BEGIN itself
+        @event.listens_for(engine, "connect")
+        def _disable_pysqlite_transactions(dbapi_connection, connection_record):
+            dbapi_connection.isolation_level = None
+
+        @event.listens_for(engine, "begin")
+        def _begin(conn):
+            conn.exec_driver_sql("BEGIN")
+    else:
+        engine = create_engine(TEST_DATABASE_URL)
+
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    Base.metadata.drop_all(bind=engine)
+    engine.dispose()
+
+
+@pytest.fixture(scope="session")
+def connection(engine):
+    """Single connection shared by every test in the session"""
+    with engine.connect() as connection:
+        yield connection
+
+
+@pytest.fixture(scope="session")
+def client(engine):
+    """
+    One TestClient for the whole session; get_db is overridden per test by db_session.
+
+    Entering the client once keeps its event loop portal and transport open
+    for every request instead of starting them per request. The schema
+    already exists on the StaticPool test engine, so the lifespan's init_db
+    is skipped rather than building it again on the app's own engine.
+    """
+    with patch.object(main, "init_db"), TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def db_session(connection):
+    """
+    Session joined to an outer transaction that is rolled back after the test.
+
+    Commits inside the test and the app only release SAVEPOINTs, so every
+    test starts from the empty schema without recreating it.
+    """
+    transaction = connection.begin()
+    session_factory = sessionmaker(
+        bind=connection, autoflush=False, join_transaction_mode="create_savepoint"
+    )
+    session = session_factory()
+
+    app.dependency_overrides[get_db] = lambda: session
+    # Background last_login writes open their own session
+    original_session_local = security.SessionLocal
+    security.SessionLocal = session_factory
+
+    yield session
+
+    security.SessionLocal = original_session_local
+    app.dependency_overrides.pop(get_db, None)
+    session.close()
+    transaction.rollback()
+    # Cached tokens and user rows would outlive the rolled back data
+    security._token_cache.clear()
+    security._user_cache.clear()
+    security._last_login_writes.clear()
+
+
+def _build_user(role: str) -> User:
+    external_id = str(uuid.uuid4())
+    return User(
+        external_id=external_id,
+        email=f"{role}-{external_id[:8]}@example.com",
+        full_name=f"Test {role.title()}",
+        role=role,
+        status="active",
+        subscription_level="Free",
+        usage_count=0,
+        monthly_limit=20,
+        failed_login_attempts=0,
+    )
+
+
+def _create_user(db_session: Session, role: str) -> User:
+    user = _build_user(role)
+    db_session.add(user)
+    db_session.commit()
+    db_session.refresh(user)
+    return user
+
+
+def _auth_headers(user: User) -> dict:
+    """
+    Mint a Supabase-style access token for user directly.
+
+    There is no password check to go through: sign-in happens in Supabase,
+    so the fixtures sign the token with the test secret instead of calling
+    a login endpoint. user_role mirrors the claim the custom access token
+    hook adds.
+    """
+    now = int(time.time())
+    token = jwt.encode(
+        {
+            "sub": user.external_id,
+            "email": user.email,
+            "aud": "authenticated",
+            "role": "authenticated",
+            "user_role": user.role,
+            "iat": now,
+            "exp": now + 3600,
+        },
+        TEST_JWT_SECRET,
+        algorithm="HS256",
+    )
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture(scope="session")
+def other_user_chat(connection):
+    """
+    Chat owned by a user other than test_user, committed once for the session.
+
+    Session fixtures are set up before db_session opens a test's outer
+    transaction, so this commit is real and survives the per-test rollbacks.
+    Only use it in tests that never modify the chat.
+    """
+    with Session(bind=connection, expire_on_commit=False) as session:
+        owner = _build_user("user")
+        chat = Chat(user_id=owner.external_id, name="Other user's chat", industry="finance")
+        session.add_all([owner, chat])
+        session.commit()
+    return chat
+
+
+@pytest.fixture
+def test_user(db_session):
+    """Active free-tier user"""
+    return _create_user(db_session, "user")
+
+
+@pytest.fixture
+def admin_user(db_session):
+    """Active admin user"""
+    return _create_user(db_session, "admin")
+
+
+@pytest.fixture
+def auth_headers(test_user):
+    """Bearer headers for test_user"""
+    return _auth_headers(test_user)
+
+
+@pytest.fixture
+def admin_auth_headers(admin_user):
+    """Bearer headers for admin_user"""
+    return _auth_headers(admin_user)
@@ -1,11 +1,18 @@
 import factory
 from factory import LazyAttribute, SubFactory
+from factory.fuzzy import FuzzyChoice
 from faker import Faker
 from backend.app.models.user import User
 from backend.app.models.chat import Chat, ChatMessage
 import uuid
 
 fake = Faker()
+_uuid4 = uuid.uuid4
+
+
+def _new_id():
+    """Random id for String primary and foreign key columns"""
+    return _uuid4().hex
 
 
 class UserFactory(factory.Factory):
@@ -14,11 +21,10 @@ class UserFactory(factory.Factory):
     class Meta:
         model = User
 
-    id = factory.LazyFunction(lambda: str(uuid.uuid4()))
+    id = factory.LazyFunction(_new_id)
     username = factory.Sequence(lambda n: f"user{n}")
     email = factory.LazyAttribute(lambda obj: f"{obj.username}@example.com")
-    hashed_password = factory.LazyFunction(lambda: User.hash_password("testpassword123"))
-    full_name = factory.Faker("name")
+    full_name = factory.Sequence(lambda n: f"User {n}")
     is_active = True
     is_admin = False
     status = "Active"
@@ -33,7 +39,6 @@ class AdminUserFactory(UserFactory):
     username = factory.Sequence(lambda n: f"admin{n}")
     email = factory.LazyAttribute(lambda obj: f"{obj.username}@example.com")
     is_admin = True
-    full_name = factory.Faker("name")
 
 
 class ChatFactory(factory.Factory):
@@ -42,10 +47,10 @@ class ChatFactory(factory.Factory):
     class Meta:
         model = Chat
 
-    id = factory.LazyFunction(lambda: str(uuid.uuid4()))
-    user_id = factory.LazyFunction(lambda: str(uuid.uuid4()))
-    name = factory.Faker("catch_phrase")
-    industry = factory.Faker("random_element", elements=["real_estate", "legal", "finance", "medical", "insurance", "management"])
+    id = factory.LazyFunction(_new_id)
+    user_id = factory.LazyFunction(_new_id)
+    name = factory.Sequence(lambda n: f"Chat {n}")
+    industry = FuzzyChoice(["real_estate", "legal", "finance", "medical", "insurance", "management"])
 
 
 class ChatMessageFactory(factory.Factory):
@@ -54,10 +59,10 @@ class ChatMessageFactory(factory.Factory):
     class Meta:
         model = ChatMessage
 
-    id = factory.LazyFunction(lambda: str(uuid.uuid4()))
-    chat_id = factory.LazyFunction(lambda: str(uuid.uuid4()))
-    role = factory.Faker("random_element", elements=["user", "assistant", "system"])
-    content = factory.Faker("text", max_nb_chars=500)
+    id = factory.LazyFunction(_new_id)
+    chat_id = factory.LazyFunction(_new_id)
+    role = FuzzyChoice(["user", "assistant", "system"])
+    content = factory.Sequence(lambda n: f"Message {n}")
 
 
 class TestDataBuilder:
@@ -71,12 +76,8 @@ class TestDataBuilder:
         db_session.commit()
         db_session.refresh(user)
 
-        chats = []
-        for _ in range(num_chats):
-            chat = ChatFactory(user_id=user.id)
-            db_session.add(chat)
-            chats.append(chat)
-
+        chats = [ChatFactory(user_id=user.id) for _ in range(num_chats)]
+        db_session.add_all(chats)
         db_session.commit()
         return user, chats
 
@@ -94,12 +95,10 @@ class TestDataBuilder:
         db_session.commit()
         db_session.refresh(chat)
 
-        messages = []
-        for i in range(num_messages):
-            role = "user" if i % 2 == 0 else "assistant"
-            message = ChatMessageFactory(chat_id=chat.id, role=role)
-            db_session.add(message)
-            messages.append(message)
-
+        messages = [
+            ChatMessageFactory(chat_id=chat.id, role="user" if i % 2 == 0 else "assistant")
+            for i in range(num_messages)
+        ]
+        db_session.add_all(messages)
         db_session.commit()
         return chat, messages
\ No newline at end of file
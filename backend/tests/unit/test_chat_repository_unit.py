@@ -205,6 +205,27 @@ class TestChatRepository:
             )
             assert message is None
 
+    def test_add_messages_success(self, chat_repo, sample_chat):
+        """Test adding several messages in one batch"""
+        messages = chat_repo.add_messages(
+            chat_id=sample_chat.id,
+            messages=[("system", "File upload processed."), ("user", "Here is my data")]
+        )
+        
+        assert messages is not None
+        assert [m.role for m in messages] == ["system", "user"]
+        assert [m.content for m in messages] == ["File upload processed.", "Here is my data"]
+        assert all(m.chat_id == sample_chat.id for m in messages)
+
+    def test_add_messages_database_error(self, chat_repo, sample_chat):
+        """Test batch message addition with database error"""
+        with patch.object(chat_repo.db, 'commit', side_effect=SQLAlchemyError("DB Error")):
+            messages = chat_repo.add_messages(
+                chat_id=sample_chat.id,
+                messages=[("user", "Error message")]
+            )
+            assert messages is None
+
     def test_get_chat_messages_success(self, chat_repo, sample_chat, db_session):
         """Test successful retrieval of chat messages"""
         # Add multiple messages
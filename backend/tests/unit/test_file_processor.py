@@ -1,7 +1,12 @@
 import pytest
 from unittest.mock import Mock, patch, AsyncMock
+import asyncio
+import io
 import json
+import os
 import pandas as pd
+from fastapi import UploadFile
+from app.services import file_processor as file_processor_module
 from app.services.file_processor import FileProcessor, process_file_content
 from app.repositories.chat import ChatRepository
 
@@ -181,6 +186,101 @@ class TestFileProcessor:
         assert file_processor.is_numerical_string("123abc") is False
         assert file_processor.is_numerical_string("") is False
 
+    def test_structure_docling_content_keyword_and_year_detection(self, file_processor):
+        """Test chart keywords and years are detected in a single pass"""
+        markdown = "A Bar Chart of ratings for 2003 and 1999; see the line graph."
+        result = file_processor._structure_docling_content(Mock(spec=[]), markdown)
+
+        assert result["found_keywords"] == ["chart", "graph", "rating", "bar chart", "line graph", "2003"]
+        years_indicator = [i for i in result["numerical_indicators"] if i.startswith("contains_years")][0]
+        assert "1999" in years_indicator
+        assert "2003" in years_indicator
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("size, colour", [((16, 16), "black"), ((512, 512), "white")])
+    async def test_process_file_skips_ocr_for_text_free_image(self, file_processor, size, colour):
+        """Test tiny or single-colour images never reach Docling OCR"""
+        Image = pytest.importorskip("PIL.Image")
+        buffer = io.BytesIO()
+        Image.new("RGB", size, colour).save(buffer, format="PNG")
+        buffer.seek(0)
+        upload = UploadFile(file=buffer, filename="blank.png")
+        file_processor.enhanced_processing_enabled = True
+
+        with patch.object(file_processor, "process_file_enhanced", new_callable=AsyncMock) as mock_enhanced:
+            result = await file_processor.process_file(upload)
+
+        mock_enhanced.assert_not_called()
+        assert result["success"] is True
+        assert result["enhanced_processing"] is False
+        assert "OCR skipped" in result["content"]["note"]
+
+    @pytest.mark.asyncio
+    async def test_process_file_image_docling_failure_not_repeated(self, file_processor):
+        """Test a failed image OCR is reported by the basic result, not retried a third time"""
+        Image = pytest.importorskip("PIL.Image")
+        buffer = io.BytesIO()
+        image = Image.new("RGB", (256, 256), "white")
+        image.paste("black", (64, 64, 192, 192))
+        image.save(buffer, format="PNG")
+        buffer.seek(0)
+        upload = UploadFile(file=buffer, filename="scan.png")
+        file_processor.enhanced_processing_enabled = True
+        failed = Mock(success=False, error_message="docling crashed")
+
+        with patch.object(file_processor, "process_file_enhanced", new_callable=AsyncMock, return_value=failed) as mock_enhanced:
+            result = await file_processor.process_file(upload)
+
+        assert mock_enhanced.await_count == 2
+        assert result["enhanced_processing"] is False
+        assert result["docling_error"] == "docling crashed"
+        assert result["content"]["note"] == "Image file uploaded. OCR processing failed."
+
+    @pytest.mark.asyncio
+    async def test_process_file_scanned_pdf_converter_options(self, file_processor):
+        """Test a scanned PDF reaches Docling with full-page OCR on the default backend"""
+        def run_inline(pool, *args):
+            future = asyncio.get_running_loop().create_future()
+            future.set_result(file_processor_module._docling_convert_chunk(*args))
+            return future
+
+        upload = UploadFile(file=io.BytesIO(b"%PDF-1.4 scanned"), filename="scan.pdf")
+        file_processor.enhanced_processing_enabled = True
+        module = "app.services.file_processor"
+
+        with patch.object(file_processor, "_is_born_digital", return_value=False), \
+             patch.object(file_processor, "_check_system_resources", return_value=True), \
+             patch(f"{module}.partial_result_cache") as mock_cache, \
+             patch(f"{module}._get_docling_pool"), \
+             patch(f"{module}._split_pdf_pages", return_value=None), \
+             patch(f"{module}._submit_docling_task", side_effect=run_inline), \
+             patch(f"{module}._export_markdown", return_value="scanned text"), \
+             patch(f"{module}._build_converter") as mock_build:
+            mock_cache.get.return_value = None
+            result = await file_processor.process_file(upload)
+
+        assert result["enhanced_processing"] is True
+        assert result["content"]["markdown_content"] == "scanned text"
+        # Only (force_ocr, ocr_language) select the converter; there is no backend switch
+        mock_build.assert_called_once_with(True, None)
+
+    @pytest.mark.asyncio
+    async def test_process_file_enhanced_removes_temp_file_when_copy_fails(self, file_processor, tmp_path):
+        """Test a failed upload copy leaves nothing behind in the upload temp directory"""
+        def fail_copy(src, fd, hasher=None):
+            os.close(fd)
+            raise OSError("No space left on device")
+
+        upload = UploadFile(file=io.BytesIO(b"%PDF-1.4"), filename="doc.pdf")
+        module = "app.services.file_processor"
+
+        with patch(f"{module}._get_upload_temp_dir", return_value=str(tmp_path)), \
+             patch(f"{module}._copy_upload", side_effect=fail_copy):
+            with pytest.raises(OSError):
+                await file_processor.process_file_enhanced(upload)
+
+        assert os.listdir(tmp_path) == []
+
 
 @pytest.mark.asyncio
 class TestProcessFileContent:
@@ -213,7 +313,7 @@ class TestProcessFileContent:
         
         assert result == "test-chat-id"
         mock_chat_repo.create_chat.assert_called_once()
-        assert mock_chat_repo.add_message.call_count == 2  # System + user message
+        mock_chat_repo.add_messages.assert_called_once()  # System + user message in one batch
 
     async def test_process_file_content_dict_data(self, mock_db, mock_chat_repo):
         """Test processing file content with dictionary data"""
@@ -267,18 +367,17 @@ class TestProcessFileContent:
         
         await process_file_content(data, user_id, mock_db)
         
-        # Verify messages were added
-        assert mock_chat_repo.add_message.call_count == 2
+        # Verify both messages were added in one batch
+        mock_chat_repo.add_messages.assert_called_once()
+        (system_role, system_content), (user_role, user_content) = mock_chat_repo.add_messages.call_args[1]["messages"]
         
         # Check system message
-        system_call = mock_chat_repo.add_message.call_args_list[0]
-        assert system_call[1]["role"] == "system"
-        assert "File upload processed" in system_call[1]["content"]
+        assert system_role == "system"
+        assert "File upload processed" in system_content
         
         # Check user message
-        user_call = mock_chat_repo.add_message.call_args_list[1]
-        assert user_call[1]["role"] == "user"
-        assert "uploaded a file" in user_call[1]["content"]
+        assert user_role == "user"
+        assert "uploaded a file" in user_content
 
     async def test_process_file_content_large_dataset_preview(self, mock_db, mock_chat_repo):
         """Test that large datasets are properly previewed"""
@@ -294,10 +393,27 @@ class TestProcessFileContent:
         await process_file_content(data, user_id, mock_db)
         
         # Check that only first 5 items are in the preview
-        user_call = mock_chat_repo.add_message.call_args_list[1]
-        user_message_content = user_call[1]["content"]
+        _, user_message_content = mock_chat_repo.add_messages.call_args[1]["messages"][1]
         
         # Should contain first 5 items but not all 10
         assert '{"id": 0}' in user_message_content
         assert '{"id": 4}' in user_message_content
-        assert '{"id": 9}' not in user_message_content
\ No newline at end of file
+        assert '{"id": 9}' not in user_message_content
+
+    async def test_process_file_content_dict_preview_is_capped(self, mock_db, mock_chat_repo):
+        """Test that a huge non-list payload is truncated in the preview"""
+        data = {"values": list(range(100000))}
+        user_id = 1
+
+        # Mock chat creation
+        mock_chat = Mock()
+        mock_chat.id = "test-chat-id"
+        mock_chat_repo.create_chat.return_value = mock_chat
+
+        await process_file_content(data, user_id, mock_db)
+
+        _, user_message_content = mock_chat_repo.add_messages.call_args[1]["messages"][1]
+
+        assert '{"values": [0, 1, 2' in user_message_content
+        assert user_message_content.endswith('...')
+        assert len(user_message_content) < 2200
\ No newline at end of file
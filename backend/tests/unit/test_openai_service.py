@@ -1,6 +1,7 @@
 import pytest
-from unittest.mock import Mock, patch, MagicMock
+from unittest.mock import Mock, patch, MagicMock, AsyncMock
 from app.services.openai_service import OpenAIService
+from app.services.cache_service import semantic_cache
 
 
 class TestOpenAIService:
@@ -14,6 +15,8 @@ class TestOpenAIService:
             mock_settings.get_openai_client.return_value = mock_client
             service = OpenAIService()
             service.client = mock_client
+            service.async_client = Mock()
+            service.async_client.chat.completions.create = AsyncMock()
             return service
 
     @pytest.fixture
@@ -81,15 +84,81 @@ class TestOpenAIService:
         
         assert "technical difficulties" in result
 
+    def test_chat_completion_low_temperature_is_cached(self, openai_service, mock_response):
+        """Test identical deterministic requests only hit the API once"""
+        openai_service.client.chat.completions.create.return_value = mock_response
+
+        messages = [{"role": "user", "content": "Cache me: is 2 + 2 equal to 4?"}]
+        first = openai_service.chat_completion(messages, max_tokens=3, temperature=0)
+        second = openai_service.chat_completion(messages, max_tokens=3, temperature=0)
+
+        assert first == second == "Test response from OpenAI"
+        openai_service.client.chat.completions.create.assert_called_once()
+
+    def test_summarize_text_is_memoized(self, openai_service, mock_response):
+        """Test summarizing the same text twice only calls the API once"""
+        openai_service.client.chat.completions.create.return_value = mock_response
+
+        text = "Quarterly report: revenue grew 12% while costs held flat."
+        first = openai_service.summarize_text(text)
+        second = openai_service.summarize_text(text)
+
+        assert first == second == "Test response from OpenAI"
+        openai_service.client.chat.completions.create.assert_called_once()
+
+    def test_chat_completion_high_temperature_not_cached(self, openai_service, mock_response):
+        """Test sampled requests always reach the API"""
+        openai_service.client.chat.completions.create.return_value = mock_response
+
+        messages = [{"role": "user", "content": "Do not cache me"}]
+        openai_service.chat_completion(messages)
+        openai_service.chat_completion(messages)
+
+        assert openai_service.client.chat.completions.create.call_count == 2
+
     @pytest.mark.asyncio
     async def test_generate_response_async(self, openai_service, mock_response):
         """Test async generate response"""
-        openai_service.client.chat.completions.create.return_value = mock_response
+        openai_service.async_client.chat.completions.create.return_value = mock_response
         
         messages = [{"role": "user", "content": "Hello"}]
         result = await openai_service.generate_response(messages)
         
         assert result == "Test response from OpenAI"
+        openai_service.client.chat.completions.create.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_achat_with_context_uses_async_client(self, openai_service, mock_response):
+        """Test async chat with context awaits the async client"""
+        openai_service.async_client.chat.completions.create.return_value = mock_response
+
+        messages = [{"role": "user", "content": "Hello"}]
+        result = await openai_service.achat_with_context(
+            messages, context_data="Revenue: $1M", profile="finance", user_question="What is the revenue?"
+        )
+
+        assert result == "Test response from OpenAI"
+        call_args = openai_service.async_client.chat.completions.create.call_args
+        assert call_args[1]['messages'][-1] == {"role": "user", "content": "What is the revenue?"}
+        openai_service.client.chat.completions.create.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_summarize_chunks_preserves_order(self, openai_service):
+        """Test chunk summaries are gathered concurrently and returned in input order"""
+        def make_response(content):
+            response = Mock()
+            response.choices = [Mock(message=Mock(content=content))]
+            return response
+
+        async def fake_create(**kwargs):
+            chunk = kwargs["messages"][-1]["content"].rsplit("\n", 1)[-1]
+            return make_response(f"summary of {chunk}")
+
+        openai_service.async_client.chat.completions.create.side_effect = fake_create
+
+        result = await openai_service.summarize_chunks(["chunk-a", "chunk-b", "chunk-c"], max_concurrency=2)
+
+        assert result == ["summary of chunk-a", "summary of chunk-b", "summary of chunk-c"]
 
     def test_analyze_data_success(self, openai_service, mock_response):
         """Test successful data analysis"""
@@ -140,6 +209,26 @@ class TestOpenAIService:
         message = openai_service.get_system_message_for_profile(profile)
         assert expected_content in message.lower()
 
+    @pytest.mark.parametrize("question,expected", [
+        ("What is the stock price of Apple?", True),
+        ("how is goog doing", True),
+        ("Show me the LATEST NEWS", True),
+        ("Summarize the uploaded file", False),
+        ("", False),
+    ])
+    def test_should_trigger_tavily_directly(self, openai_service, question, expected):
+        """Test keyword and ticker detection for live-data questions"""
+        assert openai_service.should_trigger_tavily_directly(question) is expected
+
+    def test_render_profile_prompt(self, openai_service):
+        """Test precompiled templates render like the raw format strings"""
+        rendered = openai_service.render_profile_prompt("finance", "Revenue: $1M", "What is the revenue?")
+        expected = openai_service.get_prompt_template_for_profile("finance").format(
+            document_context="Revenue: $1M", question="What is the revenue?"
+        )
+        assert rendered == expected
+        assert "Revenue: $1M" in openai_service.render_profile_prompt("unknown", "Revenue: $1M", "Q?")
+
     def test_chat_with_context_success(self, openai_service, mock_response):
         """Test chat with context and profile"""
         openai_service.client.chat.completions.create.return_value = mock_response
@@ -156,13 +245,42 @@ class TestOpenAIService:
         
         assert result == "Test response from OpenAI"
         
-        # Verify system message was added with profile and context
+        # Verify the persona comes first and the document context follows it
         call_args = openai_service.client.chat.completions.create.call_args
         actual_messages = call_args[1]["messages"]
-        assert len(actual_messages) == 2
+        assert len(actual_messages) == 3
         assert actual_messages[0]["role"] == "system"
-        assert "finance expert" in actual_messages[0]["content"]
-        assert "data context" in actual_messages[0]["content"]
+        assert actual_messages[0]["content"] == openai_service.get_system_message_for_profile("finance")
+        assert actual_messages[1]["role"] == "system"
+        assert actual_messages[1]["content"].startswith("DOCUMENT_ID=")
+        assert "100000" in actual_messages[1]["content"]
+        assert actual_messages[2] == messages[0]
+
+    def test_chat_with_context_semantic_cache_hit(self, openai_service, mock_response):
+        """Test a paraphrased question against the same context reuses the cached answer"""
+        semantic_cache.clear()
+        openai_service.client.chat.completions.create.return_value = mock_response
+        embedding_response = Mock()
+        embedding_response.data = [Mock(embedding=[0.6, 0.8, 0.0])]
+        openai_service.client.embeddings.create.return_value = embedding_response
+
+        first = openai_service.chat_with_context([], context_data="Revenue: $1M", user_question="GOOG current price")
+        embedding_response.data = [Mock(embedding=[0.61, 0.79, 0.0])]
+        second = openai_service.chat_with_context([], context_data="Revenue: $1M", user_question="stock price of GOOG today")
+
+        assert first == second == "Test response from OpenAI"
+        openai_service.client.chat.completions.create.assert_called_once()
+        semantic_cache.clear()
+
+    def test_chat_with_context_skips_semantic_cache_with_history(self, openai_service, mock_response):
+        """Test follow-up questions go straight to the completion without embedding"""
+        openai_service.client.chat.completions.create.return_value = mock_response
+        history = [{"role": "user", "content": "Hello"}, {"role": "assistant", "content": "Hi"}]
+
+        result = openai_service.chat_with_context(history, context_data="Revenue: $1M", user_question="And profit?")
+
+        assert result == "Test response from OpenAI"
+        openai_service.client.embeddings.create.assert_not_called()
 
     def test_chat_with_context_no_profile(self, openai_service, mock_response):
         """Test chat with context but no profile"""
@@ -0,0 +1,213 @@
+import base64
+import json
+import time
+
+import jwt
+import pytest
+from fastapi import HTTPException
+
+from app.utils import security
+from app.utils.security import _decode_hs256, _hs256_key, verify_supabase_token
+
+SECRET = "unit-test-secret"
+AUDIENCE = "authenticated"
+
+
+def _b64(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _claims(**overrides):
+    """Valid Supabase-style claims, with overrides; a None value drops the claim"""
+    now = int(time.time())
+    claims = {"sub": "user-123", "aud": AUDIENCE, "iat": now, "exp": now + 3600}
+    claims.update(overrides)
+    return {key: value for key, value in claims.items() if value is not None}
+
+
+def _token(claims=None, secret=SECRET, header=None):
+    """Sign claims as HS256 by hand, so the header can carry any alg"""
+    header = header or {"alg": "HS256", "typ": "JWT"}
+    signing_input = f"{_b64(json.dumps(header).encode())}.{_b64(json.dumps(claims or _claims()).encode())}"
+    mac = _hs256_key(secret)
+    mac.update(signing_input.encode("ascii"))
+    return f"{signing_input}.{_b64(mac.digest())}"
+
+
+def _decode(token):
+    return _decode_hs256(token, _hs256_key(SECRET), audience=AUDIENCE)
+
+
+class TestDecodeHS256:
+    """Test suite for the hand-rolled HS256 verifier"""
+
+    def test_valid_token(self):
+        """Test a well-formed token decodes to its claims"""
+        claims = _claims()
+        assert _decode(_token(claims)) == claims
+
+    def test_matches_pyjwt_encoding(self):
+        """Test tokens minted by PyJWT, as Supabase issues them, are accepted"""
+        claims = _claims()
+        assert _decode(jwt.encode(claims, SECRET, algorithm="HS256")) == claims
+
+    def test_wrong_signature(self):
+        """Test a token signed with another secret is rejected"""
+        with pytest.raises(jwt.InvalidSignatureError):
+            _decode(_token(secret="another-secret"))
+
+    def test_tampered_payload(self):
+        """Test a payload swapped after signing is rejected"""
+        header, _, signature = _token().split(".")
+        forged = _b64(json.dumps(_claims(sub="admin")).encode())
+        with pytest.raises(jwt.InvalidSignatureError):
+            _decode(f"{header}.{forged}.{signature}")
+
+    @pytest.mark.parametrize("alg", ["none", "RS256", "HS512"])
+    def test_disallowed_algorithm(self, alg):
+        """Test any alg but HS256 is rejected, even with a valid HMAC"""
+        with pytest.raises(jwt.InvalidAlgorithmError):
+            _decode(_token(header={"alg": alg, "typ": "JWT"}))
+
+    def test_unsigned_none_token(self):
+        """Test an alg=none token with an empty signature is rejected"""
+        header = _b64(json.dumps({"alg": "none", "typ": "JWT"}).encode())
+        payload = _b64(json.dumps(_claims()).encode())
+        with pytest.raises(jwt.InvalidAlgorithmError):
+            _decode(f"{header}.{payload}.")
+
+    def test_expired_token(self):
+        """Test a token past its exp is rejected"""
+        with pytest.raises(jwt.ExpiredSignatureError):
+            _decode(_token(_claims(exp=int(time.time()) - 10)))
+
+    def test_nbf_in_future(self):
+        """Test a token not valid yet by nbf is rejected"""
+        with pytest.raises(jwt.ImmatureSignatureError):
+            _decode(_token(_claims(nbf=int(time.time()) + 600)))
+
+    def test_iat_in_future(self):
+        """Test a token issued in the future is rejected"""
+        with pytest.raises(jwt.ImmatureSignatureError):
+            _decode(_token(_claims(iat=int(time.time()) + 600)))
+
+    @pytest.mark.parametrize("claim", ["exp", "sub", "aud"])
+    def test_missing_required_claim(self, claim):
+        """Test tokens without exp, sub or aud are rejected"""
+        with pytest.raises(jwt.MissingRequiredClaimError):
+            _decode(_token(_claims(**{claim: None})))
+
+    def test_non_numeric_exp(self):
+        """Test a string exp is rejected rather than compared"""
+        with pytest.raises(jwt.DecodeError):
+            _decode(_token(_claims(exp="tomorrow")))
+
+    def test_wrong_audience(self):
+        """Test a token for another audience is rejected"""
+        with pytest.raises(jwt.InvalidAudienceError):
+            _decode(_token(_claims(aud="anon")))
+
+    def test_audience_list(self):
+        """Test a list audience is accepted only when it contains ours"""
+        claims = _claims(aud=["other", AUDIENCE])
+        assert _decode(_token(claims)) == claims
+        with pytest.raises(jwt.InvalidAudienceError):
+            _decode(_token(_claims(aud=["other", "anon"])))
+
+    @pytest.mark.parametrize("segments", [2, 4])
+    def test_wrong_segment_count(self, segments):
+        """Test tokens without exactly three segments are rejected"""
+        parts = _token().split(".")
+        token = ".".join(parts[:2]) if segments == 2 else ".".join(parts + [parts[-1]])
+        with pytest.raises(jwt.DecodeError):
+            _decode(token)
+
+    @pytest.mark.parametrize("token", [
+        "a$b.e30.c2ln",
+        "e30.not*base64.c2ln",
+        "e30.e30.a",
+        f"{_b64(b'not json')}.e30.c2ln",
+        f"{_b64(b'[1]')}.e30.c2ln",
+    ])
+    def test_bad_encoding(self, token):
+        """Test undecodable segments fail as DecodeError, not a server error"""
+        with pytest.raises(jwt.DecodeError):
+            _decode(token)
+
+
+class TestVerifySupabaseToken:
+    """Test suite for verify_supabase_token and its payload cache"""
+
+    @pytest.fixture(autouse=True)
+    def supabase_key(self, monkeypatch):
+        """Verify against the test secret with an empty token cache"""
+        monkeypatch.setattr(security, "_SUPABASE_HS256_KEY", _hs256_key(SECRET))
+        security._token_cache.clear()
+        yield
+        security._token_cache.clear()
+
+    def test_valid_token_is_cached(self):
+        """Test a verified payload is cached and served without re-verifying"""
+        token = _token()
+        payload = verify_supabase_token(token)
+
+        assert security._token_cache.get(security._token_cache_key(token)) == payload
+        with pytest.MonkeyPatch.context() as mp:
+            mp.setattr(security, "_decode_hs256", lambda *args, **kwargs: pytest.fail("decoded again"))
+            assert verify_supabase_token(token) == payload
+
+    def test_cached_token_expiry_is_checked(self):
+        """Test a cached payload past its exp is rejected and evicted"""
+        token = _token()
+        cache_key = security._token_cache_key(token)
+        security._token_cache.set(cache_key, _claims(exp=int(time.time()) - 1))
+
+        with pytest.raises(HTTPException) as exc_info:
+            verify_supabase_token(token)
+
+        assert exc_info.value.status_code == 401
+        assert exc_info.value.detail == "Token has expired"
+        assert security._token_cache.get(cache_key) is None
+
+    def test_cached_payload_outlives_ttl(self, monkeypatch):
+        """Test cached payloads are dropped after TOKEN_CACHE_TTL so revocation takes effect"""
+        token = _token()
+        verify_supabase_token(token)
+        later = time.monotonic() + security.TOKEN_CACHE_TTL + 1
+        monkeypatch.setattr(security.time, "monotonic", lambda: later)
+
+        assert security._token_cache.get(security._token_cache_key(token)) is None
+
+    def test_expired_token(self):
+        """Test an expired token maps to a 401 and is not cached"""
+        token = _token(_claims(exp=int(time.time()) - 10))
+
+        with pytest.raises(HTTPException) as exc_info:
+            verify_supabase_token(token)
+
+        assert exc_info.value.status_code == 401
+        assert exc_info.value.detail == "Token has expired"
+        assert security._token_cache.get(security._token_cache_key(token)) is None
+
+    @pytest.mark.parametrize("token", [
+        _token(secret="another-secret"),
+        _token(header={"alg": "none", "typ": "JWT"}),
+        _token(_claims(aud="anon")),
+        "not-a-token",
+    ])
+    def test_invalid_token(self, token):
+        """Test every verification failure maps to a 401"""
+        with pytest.raises(HTTPException) as exc_info:
+            verify_supabase_token(token)
+
+        assert exc_info.value.status_code == 401
+        assert exc_info.value.detail == "Invalid authentication token"
+
+    def test_missing_secret(self, monkeypatch):
+        """Test a missing SUPABASE_JWT_SECRET is a server error"""
+        monkeypatch.setattr(security, "_SUPABASE_HS256_KEY", None)
+
+        with pytest.raises(HTTPException) as exc_info:
+            verify_supabase_token(_token())
+
+        assert exc_info.value.status_code == 500